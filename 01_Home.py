@@ -1,11 +1,8 @@
 ###########################
 # Import libraries
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
+from sri.lazy import warm_up_modules
 
 
 ###########################
@@ -22,6 +19,9 @@ st.sidebar.markdown("Welcome to the SRI dashboard. Navigate using the menu above
 st.sidebar.image("images/I4DI Logo Black.png", width=150)
 st.sidebar.image("images/CUSP Logo Black.png", width=200)
 
+# Import the libraries behind the other pages in the background while this one is read
+warm_up_modules(["pandas", "pyarrow", "plotly.express", "pydeck", "folium", "streamlit_folium"])
+
 
 
 st.markdown("<h1 style='text-align: center; font-size: 60px;'>Education at Risk: Mapping Climate Threats to Schools</h1>", unsafe_allow_html=True)
@@ -1,11 +1,11 @@
 import streamlit as st
-import folium
-from streamlit_folium import st_folium
-import pandas as pd
 
-import plotly.express as px
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
+from sri.lazy import lazy_import
+
+# Heavy modules load on first use, i.e. only when a tab that needs them is open
+data = lazy_import("sri.data")
+figures = lazy_import("sri.figures")
+scenario = lazy_import("sri.scenario")
 
 
 # Page config
@@ -35,72 +35,52 @@ st.markdown("""
 
 
 
-###########################
-
-# Load Data
-df = pd.read_csv("countries_SRI_simplified_inclWBdata.csv")
-
-# Define color categories
-SRI_colors = {
-    "Low": "#ebeff1",
-    "Low-Medium": "#F2E8CF",
-    "Medium-High": "#81B29A",
-    "High": "#4C5F70",
-    "Extremely High": "#293241"
-}
-SRI_categories = ["Low", "Low-Medium", "Medium-High", "High", "Extremely High"]
-
-# Choropleth map function
-def make_choropleth():
-    fig = px.choropleth(
-        df,
-        locations="GID",
-        color="SRI_category",
-        locationmode="ISO-3",
-        color_discrete_map=SRI_colors,
-        category_orders={'SRI_category': SRI_categories},
-        projection="robinson",
-        custom_data=["COUNTRY", "GID", "REGION", "INCOME GROUP", "SRI", "SRI_category", "coastflood", "rivflood", "watersc", "heatwvs", "pm25", "cyclns"]
-    )
-    fig.update_layout(
-        geo=dict(showland=False, showocean=False, showcountries=False, showframe=False, bgcolor='rgba(0,0,0,0)'),
-        margin=dict(l=0, r=0, t=0, b=0),
-        height=600,
-        legend=dict(
-            title=dict(
-                text="<b>SRI Categories</b>"
-            ), 
-            orientation="h", 
-            yanchor="top", 
-            xanchor="auto")
-    )
-    fig.update_traces(
-        hovertemplate=(
-            "<b>%{customdata[0]}: %{customdata[5]}</b><br>"
-            "<u>SRI:</u> %{customdata[4]:.2f}<br>"
-            "Water Scarcity: %{customdata[8]}<br>"
-            "Riverine Flooding: %{customdata[7]}<br>"
-            "Coastal Flooding: %{customdata[6]}<br>"
-            "Tropical Cyclones: %{customdata[11]}<br>"
-            "Air Pollution: %{customdata[10]}<br>"
-            "Heatwaves: %{customdata[9]}<br>"
-        )
-    )
-    return fig
-
-
 ###########################
 # Tabs to navigate between map and other data
-page = st.tabs(["SCHOOL RISK INDEX MAP", "METHODOLOGY", "CONTEXTUAL DATA"])
+# (on_change="rerun" lets each tab skip its work while it isn't open)
+page = st.tabs(["SCHOOL RISK INDEX MAP", "METHODOLOGY", "CONTEXTUAL DATA"], on_change="rerun")
 
 
 ###########################
 # Map page
-with page[0]:
+# (a fragment: the level toggle and weight sliders rerun only the map)
+
+@st.fragment
+def sri_map():
     st.markdown("""
-            The map below visualizes the School Risk Index for all countries included in the model. Hover over a country to see its School Risk Index and the exposure of schools to the six climate hazards included in the model.
+        The map below visualizes the School Risk Index for all countries included in the model. Hover over a country to see its School Risk Index and the exposure of schools to the six climate hazards included in the model.
     """)
-    st.plotly_chart(make_choropleth(), use_container_width=True, key="map_intro")
+    # Province-level map, once the admin-1 index has been computed (python -m sri.admin)
+    admin1_map = figures.admin1_choropleth()
+    level = st.radio("Level", ["Country", "Province (admin-1)"], horizontal=True) if admin1_map is not None else "Country"
+    if level == "Country":
+        # What-if weights (see sri/scenario.py); recomputed per weight vector and memoized
+        with st.expander("What if hazards were weighted differently?"):
+            st.markdown("Adjust how much each hazard counts towards the School Risk Index. A weight of 0 drops the hazard from the index.")
+            cols = st.columns(3)
+            weights = [
+                cols[i % 3].slider(label, 0.0, 2.0, 1.0, 0.25, key=f"weight_{name}")
+                for i, (name, label) in enumerate(scenario.HAZARD_LABELS.items())
+            ]
+            if not any(weights):
+                st.warning("At least one hazard needs a weight above 0.")
+                weights = list(scenario.DEFAULT_WEIGHTS)
+
+        st.plotly_chart(figures.scenario_choropleth(weights), use_container_width=True, key="map_intro")
+
+        if tuple(weights) != scenario.DEFAULT_WEIGHTS:
+            changes = scenario.category_changes(data.scenario_countries(weights))
+            st.markdown(f"**{len(changes)} countries change SRI category under these weights.**")
+            st.dataframe(changes.rename(columns={"COUNTRY": "Country", "SRI_category (published)": "Category (published)", "SRI": "SRI (scenario)", "SRI_category": "Category (scenario)"}),
+                         hide_index=True, use_container_width=True)
+    else:
+        st.plotly_chart(admin1_map, use_container_width=True, key="map_admin1")
+        st.caption("Province scores are normalized across all provinces, so they are comparable with each other but not with the country scores.")
+
+
+with page[0]:
+    if page[0].open:
+        sri_map()
 
 
 ###########################
@@ -169,111 +149,12 @@ with page[1]:
 
 ###########################
 # Context Page
-with page[2]:
-
-# === Charts ===
-
-    st.markdown("<h5 style='margin-top:0rem;'>Distribution Overview</h5>", unsafe_allow_html=True)
+# (the country table is a fragment: sorting reruns only the table)
 
-    st.markdown("""
-                The charts below provide an overview of the distribution of School Risk Index (SRI) values across World Bank regions and income groups. 
-    """)
-    
-    # Prepare data
-    df["REGION"] = df["REGION"].str.strip().str.title()
-    df_bar = df.groupby(["REGION", "SRI_category"]).size().reset_index(name="count")
-    df_bar = df_bar.pivot(index="REGION", columns="SRI_category", values="count").fillna(0)
-    df_bar_pct = df_bar.div(df_bar.sum(axis=1), axis=0).reset_index()
-
-    # --- Sort regions by combined share of "Extremely High" and "High" ---
-    df_bar_pct["high_share"] = df_bar_pct.get("High", 0) + df_bar_pct.get("Extremely High", 0)
-    region_order = df_bar_pct.sort_values("high_share")["REGION"].tolist()  # ascending: lowest left, highest right
-
-    df_melted = df_bar_pct.melt(id_vars="REGION", var_name="SRI Category", value_name="Percentage")
-
-    df["INCOME GROUP"] = df["INCOME GROUP"].str.strip().str.title()
-    df_income = df.groupby(["INCOME GROUP", "SRI_category"]).size().reset_index(name="count")
-    df_income = df_income.pivot(index="INCOME GROUP", columns="SRI_category", values="count").fillna(0)
-    df_income_pct = df_income.div(df_income.sum(axis=1), axis=0).reset_index()
-    df_income_melted = df_income_pct.melt(id_vars="INCOME GROUP", var_name="SRI Category", value_name="Percentage")
-
-    # Create side-by-side subplot
-    fig = make_subplots(
-        rows=1, cols=2,
-        shared_yaxes=True,
-        horizontal_spacing=0.08,
-        subplot_titles=("SRI Distribution by Region", "SRI Distribution by Income Group")
-    )
-
-    # Region bars (left)
-    for category in SRI_categories:
-        data = df_melted[df_melted["SRI Category"] == category]
-        # Ensure the order of regions
-        data = data.set_index("REGION").reindex(region_order).reset_index()
-        fig.add_trace(
-            go.Bar(
-                x=data["REGION"],
-                y=data["Percentage"],
-                name=category,
-                marker=dict(color=SRI_colors[category]),
-                legendgroup=category,
-                legendrank=SRI_categories.index(category)
-            ),
-            row=1, col=1
-        )
-
-    income_order = ["Low Income", "Lower Middle Income", "Upper Middle Income", "High Income"]
-
-    # Income bars (right)
-    for category in SRI_categories:
-        data = df_income_melted[df_income_melted["SRI Category"] == category]
-        # Ensure the order of income groups
-        data = data.set_index("INCOME GROUP").reindex(income_order).reset_index()
-        fig.add_trace(
-            go.Bar(
-                x=data["INCOME GROUP"],
-                y=data["Percentage"],
-                name=category,
-                marker=dict(color=SRI_colors[category]),
-                legendgroup=category,
-                legendrank=SRI_categories.index(category),
-                showlegend=False  # Only show once
-            ),
-            row=1, col=2
-        )
-
-    # Final layout tweaks
-    fig.update_layout(
-        barmode="stack",
-        height=500,
-        yaxis_tickformat=".0%",
-        margin=dict(t=60, b=60),
-        xaxis_tickangle=-45,
-        xaxis2_tickangle=-45,
-        xaxis=dict(title="", showticklabels=True),
-        xaxis2=dict(title="", showticklabels=True),
-        yaxis=dict(range=[0, 1]),
-        legend=dict(
-            title='SRI Categories',
-            orientation="h",
-            yanchor="bottom",
-            y=1.12,
-            xanchor="center",
-            x=0.5
-        )
-    )
-
-    # Display
-    st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
-
-
-    # === Table ===
-
-    st.markdown("<h5 style='margin-top:0rem;'>Country-Level Data</h5>", unsafe_allow_html=True)
-
-    st.markdown("""
-                Hover over the table and select the magnifying glass icon on the top right to search for specific countries or regions.
-    """)
+@st.fragment
+def country_table():
+    # Bootstrap intervals, when computed (python -m sri.uncertainty)
+    df = figures.with_uncertainty(data.countries())
 
     # Drop and rename columns
     df_clean = df.drop(columns=["SOVEREIGN", "CONTINENT", "GID", "INCOME GROUP", "SRI_ncategory"], errors="ignore").rename(columns={
@@ -284,7 +165,10 @@ with page[2]:
         "watersc":"Water Scarcity", 
         "heatwvs":"Heatwaves", 
         "pm25":"Air Pollution", 
-        "cyclns":"Tropical Cyclones"
+        "cyclns":"Tropical Cyclones",
+        "SRI_low": "SRI (low)",
+        "SRI_high": "SRI (high)",
+        "p_category_change": "Chance of Other Category"
     })
 
     # Toggle for sorting
@@ -293,4 +177,35 @@ with page[2]:
 
     df_sorted = df_clean.sort_values(by="SRI", ascending=ascending)
 
-    st.dataframe(df_sorted.reset_index(drop=True), use_container_width=True)
\ No newline at end of file
+    st.dataframe(df_sorted.reset_index(drop=True), use_container_width=True, column_config={
+        "Chance of Other Category": st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1),
+    })
+    if "SRI (low)" in df_sorted.columns:
+        st.caption("SRI (low) and SRI (high) bound a 90% interval from resampling schools according to each country's estimated OpenStreetMap coverage. "
+                   "The last column is the share of resamples in which the country falls into a different SRI category.")
+
+
+with page[2]:
+    if page[2].open:
+
+    # === Charts ===
+
+        st.markdown("<h5 style='margin-top:0rem;'>Distribution Overview</h5>", unsafe_allow_html=True)
+
+        st.markdown("""
+                The charts below provide an overview of the distribution of School Risk Index (SRI) values across World Bank regions and income groups. 
+    """)
+    
+        # Distribution charts (from the precomputed cube, cached per data version, see sri/figures.py)
+        st.plotly_chart(figures.sri_distribution(), use_container_width=True, config={"displayModeBar": False})
+
+
+        # === Table ===
+
+        st.markdown("<h5 style='margin-top:0rem;'>Country-Level Data</h5>", unsafe_allow_html=True)
+
+        st.markdown("""
+                Hover over the table and select the magnifying glass icon on the top right to search for specific countries or regions.
+    """)
+
+        country_table()
@@ -1,10 +1,21 @@
+import os
+import time
+
 import streamlit as st
-import pandas as pd
-import geopandas as gpd
-import folium
-from streamlit_folium import st_folium
-import plotly.express as px
-import pydeck as pdk
+
+from sri.lazy import lazy_import
+
+# Heavy modules load on first use, i.e. only when a tab that needs them is open
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
+subplots = lazy_import("plotly.subplots")
+pdk = lazy_import("pydeck")
+data = lazy_import("sri.data")
+hazards = lazy_import("sri.hazards")
+lod = lazy_import("sri.lod")
+transport = lazy_import("sri.transport")
+folium = lazy_import("folium")
+streamlit_folium = lazy_import("streamlit_folium")
 
 ###########################
 # Page configuration
@@ -22,109 +33,221 @@ st.sidebar.image("images/CUSP Logo Black.png", width=200)
 
 st.title("School Risk Index: School Data")
 
-# Load data
-@st.cache_data
-def load_data():
-    return gpd.read_parquet("data/schools_exposure_cleaned.parquet")
-
-gdf = load_data()
-gdf["lon"] = gdf.geometry.x
-gdf["lat"] = gdf.geometry.y
-
 # ===========================
 # TABS
-tab1, tab2, tab3 = st.tabs(["OVERVIEW", "INTERACTIVE COUNTRY EXPLORER", "DATA VALIDATION"])
+# (on_change="rerun" lets each tab skip its work while it isn't open)
+tab1, tab2, tab3 = st.tabs(["OVERVIEW", "INTERACTIVE COUNTRY EXPLORER", "DATA VALIDATION"], on_change="rerun")
 
 # ===========================
 # TAB 1 — Overview Map (static, no zoom/pan)
 
 with tab1:
-    st.markdown("#### Overview of School Coverage")
-    st.markdown("""
+    if tab1.open:
+        st.markdown("#### Overview of School Coverage")
+        st.markdown("""
                 School location data was retrieved from [OpenStreetMap](https://www.openstreetmap.org/), the currently most comprehensive source of school locations wordwide publicly available. 
                 The map below shows a simplified overview of the distribution of schools included in the data. The total number of schools included in the School Risk Index is 1.34 million. 
                 To explore individual schools, please switch to the 'Interactive Country Explorer' tab. For a detailed description of the data processing steps, please refer to the [Methodology Paper](https://drive.google.com/file/d/1KcqDYsxFOzbaQK7IcdecrTtaV3MrA-Y5/view?usp=share_link).
     """)
 
-    with open("images/schools_overview.html", "r") as f:
-        html = f.read()
-
-    st.components.v1.html(html, height=700)
+        # Density image rendered from the school store (python -m sri.density); the old HTML map is the fallback
+        if os.path.exists("images/schools_overview.png"):
+            st.image("images/schools_overview.png", use_container_width=True)
+        else:
+            st.components.v1.html(data.text_file("images/schools_overview.html"), height=700)
 
 # ===========================
 # TAB 2 — Filter by Country
+# (a fragment: changing the country, filters or map reruns only this tab)
 
-# Mapbox API key
-pdk.settings.mapbox_api_key = st.secrets["MAPBOX_API_KEY"]
+@st.fragment
+def country_explorer():
+    # Mapbox API key
+    pdk.settings.mapbox_api_key = st.secrets["MAPBOX_API_KEY"]
+
+    # Load data (shared across sessions, see sri/data.py)
+    countries = data.school_countries()
 
-with tab2:
     st.markdown("#### Explore Individual Schools by Country")
     st.markdown("Use the drop-down menu below to select a country of interest. This displays all schools in that country that are included in our data. Hover over a school point to display a pop-up with contextual information.")
 
     # Select and filter
-    country = st.selectbox("Select a country", sorted(gdf["Country"].dropna().unique()))
-    country_data = gdf[gdf["Country"] == country].copy()
+    country = st.selectbox("Select a country", countries["Country"])
+    country_data = data.country_schools(country)
 
     # Show count
-    st.markdown(f"**Total schools mapped in {country}:** {len(country_data):,}")
-
-    # Handle missing values
-    country_data.fillna("N/A", inplace=True)
-
-    # Extract hazards
-    hazard_columns = ["Water Scarcity", "Coastal Flooding", "Riverine Flooding", "Heatwaves", "Cyclones Cat 1&2", "Cyclones Cat 3+", "PM2.5 above 9μg/m³", "PM2.5 above 35μg/m³"]
-
-    def extract_hazards(row):
-        return ", ".join([hazard for hazard in hazard_columns if row.get(hazard, 0) == 1]) or "None"
-    country_data["Hazards"] = country_data.apply(extract_hazards, axis=1)
-
-    # Map center
-    lat_center = country_data["lat"].mean()
-    lon_center = country_data["lon"].mean()
-
-    # Layer setup
-    detailed_layer = pdk.Layer(
-        "ScatterplotLayer",
-        data=country_data,
-        get_position=["lon", "lat"],
-        get_radius=8,
-        get_radius_units="pixels",
-        radius_min_pixels=4,    # fallback minimum size
-        radius_max_pixels=10,   # optional
-        get_fill_color=[30, 150, 60, 150],
-        pickable=True,
-    )
-
-    # Tooltip
-    tooltip = {
-        "html": (
-            "<b>{School Name}</b><br>"
-            "<u>Country:</u> {Country}<br>"
-            "<u>Affected by:</u> {Hazards}"
-        ),
-        "style": {
-            "backgroundColor": "white",
-            "color": "black",
-            "fontSize": "12px"
+    n_exposed = (country_data["hazard_mask"] > 0).sum()
+    st.markdown(f"**Total schools mapped in {country}:** {len(country_data):,} ({n_exposed:,} exposed to at least one hazard)")
+
+    # Map center (of all the country's schools, so it stays put while filtering)
+    lat_center = float(country_data["lat"].mean())
+    lon_center = float(country_data["lon"].mean())
+
+    # Hazard filter, counted on the bitmap index (see sri/bitmap.py)
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        hazard_filter = st.multiselect("Filter by hazard exposure", hazards.HAZARD_COLUMNS)
+    with col2:
+        match_mode = st.radio("Schools exposed to", ["all selected", "any selected"], horizontal=True)
+
+    if hazard_filter:
+        index = data.hazard_index()
+        bits = index.match(hazard_filter, mode=match_mode.split()[0])
+        by_region = index.count_by_region(bits)
+        region = index.region(country)
+        country_data = country_data.iloc[index.country_rows(bits, country)]
+        st.markdown(f"**Matching schools:** {len(country_data):,} in {country} · "
+                    f"{by_region.get(region, 0):,} in {region} · {index.count(bits):,} worldwide")
+
+    map_extent = st.radio("Map extent", ["Selected country", "Current map view (all countries)"], horizontal=True,
+                          help="In map view mode, panning and zooming shows the schools inside the visible area, across borders.")
+
+    if map_extent == "Selected country":
+        # Level of detail: large countries are aggregated on the server instead of sending every school
+        aggregated = len(country_data) > lod.POINT_BUDGET
+
+        if aggregated:
+            st.caption(f"{country} has more than {lod.POINT_BUDGET:,} schools to show, so they are shown aggregated on a grid. "
+                       "Darker cells have a higher share of schools exposed to at least one hazard.")
+            if hazard_filter:
+                grid = lod.grid_aggregate(country_data["lon"], country_data["lat"], country_data["hazard_mask"])
+                grid["color"] = lod.exposure_colors(grid["share_exposed"])
+            else:
+                grid = data.country_grid(country)
+
+            detailed_layer = pdk.Layer(
+                "GridCellLayer",
+                data=transport.deck_records(grid.rename(columns=lod.CELL_HAZARD_KEYS),
+                                            ["n_schools", "n_exposed", "color", *lod.CELL_HAZARD_KEYS.values()]),
+                get_position="p",
+                cell_size=grid.attrs["cell_size"],
+                extruded=False,
+                get_fill_color="color",
+                pickable=True,
+            )
+            tooltip_html = (
+                "<b>{n_schools} schools</b><br>"
+                "<u>Exposed to at least one hazard:</u> {n_exposed}"
+                + "".join(f"<br>{hazard}: {{{key}}}" for hazard, key in lod.CELL_HAZARD_KEYS.items())
+            )
+
+        else:
+            # Only ship the columns the tooltip uses
+            detailed_layer = pdk.Layer(
+                "ScatterplotLayer",
+                data=transport.deck_records(country_data, lod.POINT_COLUMNS, fill="N/A"),
+                get_position="p",
+                get_radius=8,
+                get_radius_units="pixels",
+                radius_min_pixels=4,    # fallback minimum size
+                radius_max_pixels=10,   # optional
+                get_fill_color=[30, 150, 60, 150],
+                pickable=True,
+            )
+            tooltip_html = (
+                "<b>{School Name}</b><br>"
+                f"<u>Country:</u> {country}<br>"
+                "<u>Affected by:</u> {Hazards}"
+            )
+
+        # Tooltip
+        tooltip = {
+            "html": tooltip_html,
+            "style": {
+                "backgroundColor": "white",
+                "color": "black",
+                "fontSize": "12px"
+            }
         }
-    }
-
-    # Display map
-    st.pydeck_chart(pdk.Deck(
-        map_style="mapbox://styles/mapbox/light-v9",
-        initial_view_state=pdk.ViewState(
-            latitude=lat_center,
-            longitude=lon_center,
-            zoom=4
-        ),
-        layers=[detailed_layer],
-        tooltip=tooltip
-    ))
+
+        # Display map
+        st.pydeck_chart(pdk.Deck(
+            map_style="mapbox://styles/mapbox/light-v9",
+            initial_view_state=pdk.ViewState(
+                latitude=lat_center,
+                longitude=lon_center,
+                zoom=4
+            ),
+            layers=[detailed_layer],
+            tooltip=tooltip
+        ))
+
+    else:
+        # Viewport query on the grid index over all schools (see sri/spatial.py); every pan/zoom returns the bounds and reruns
+        school_grid = data.school_grid()
+        bounds = (st.session_state.get("school_viewport") or {}).get("bounds")
+        if bounds and bounds.get("_southWest"):
+            west, south = bounds["_southWest"]["lng"], bounds["_southWest"]["lat"]
+            east, north = bounds["_northEast"]["lng"], bounds["_northEast"]["lat"]
+        else:
+            all_schools = data.country_schools(country)
+            west, south, east, north = all_schools["lon"].min(), all_schools["lat"].min(), all_schools["lon"].max(), all_schools["lat"].max()
+
+        start = time.perf_counter()
+        view, n_in_view = school_grid.query(west, south, east, north, hazards=hazard_filter, mode=match_mode.split()[0])
+        query_ms = (time.perf_counter() - start) * 1000
+
+        shown = f", showing an even sample of {len(view):,}" if n_in_view > len(view) else ""
+        st.caption(f"{n_in_view:,} schools in view{shown} · index query {query_ms:.0f} ms")
+
+        view_map = folium.Map(location=[lat_center, lon_center], zoom_start=6, tiles="CartoDB positron", prefer_canvas=True)
+        schools_layer = folium.FeatureGroup(name="Schools")
+        folium.GeoJson(
+            transport.geojson_points(view, ["School Name", "Country", "Hazards"], fill="N/A"),
+            marker=folium.CircleMarker(radius=4, weight=0, fill=True, fill_color="#1e963c", fill_opacity=0.6),
+            tooltip=folium.GeoJsonTooltip(fields=["School Name", "Country", "Hazards"], aliases=["", "Country:", "Affected by:"]),
+        ).add_to(schools_layer)
+
+        # Only the schools layer is replaced on reruns, so the map keeps its position
+        streamlit_folium.st_folium(
+            view_map,
+            key="school_viewport",
+            feature_group_to_add=schools_layer,
+            center=(lat_center, lon_center),
+            returned_objects=["bounds", "last_clicked"],
+            use_container_width=True,
+            height=600,
+        )
+
+    # ---------------------------
+    # Nearest schools to a location, on the same grid index (see sri/spatial.py).
+    # Only computed once the panel is opened, since a cold grid index reads every country.
+    nearest_panel = st.expander("Schools near a location", key="nearest_schools", on_change="rerun")
+    if nearest_panel.open:
+        with nearest_panel:
+            st.markdown("Enter coordinates, or click the map in map view mode, to list the nearest schools and the hazards they are exposed to.")
+
+            clicked = (st.session_state.get("school_viewport") or {}).get("last_clicked") if map_extent != "Selected country" else None
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                near_lat = st.number_input("Latitude", -90.0, 90.0, float(clicked["lat"] if clicked else lat_center), format="%.4f")
+            with col2:
+                near_lon = st.number_input("Longitude", -180.0, 180.0, float(clicked["lng"] if clicked else lon_center), format="%.4f")
+            with col3:
+                radius_km = st.slider("Radius (km)", 1, 100, 10)
+            with col4:
+                n_nearest = st.number_input("Schools to list", 1, 200, 20)
+
+            nearby, n_within = data.school_grid().nearest(near_lon, near_lat, k=n_nearest, radius_km=radius_km)
+            st.markdown(f"**{n_within:,} schools within {radius_km} km**" + (f", nearest {len(nearby):,} listed" if n_within > len(nearby) else ""))
+            st.dataframe(
+                nearby[["School Name", "Country", "distance_km", "Hazards"]].rename(columns={"distance_km": "Distance (km)"}),
+                hide_index=True,
+                column_config={"Distance (km)": st.column_config.NumberColumn(format="%.2f")},
+                use_container_width=True,
+            )
+
+
+with tab2:
+    if tab2.open:
+        country_explorer()
 
 # ===========================
 # TAB 3 — Data validation
+# (a fragment: the map toggle reruns only this tab)
 
-with tab3:
+@st.fragment
+def data_validation():
     st.markdown("#### Data Validation using Government Data")
     st.markdown(
         "The SRI's school location data was validated to measure quality using a stratified sample " \
@@ -134,7 +257,7 @@ with tab3:
         "compared to official government data on school numbers to assess the quality of the SRI school coverage.")
 
     # Load Data
-    val_df = pd.read_csv("data/schools_validation.csv")
+    val_df = data.school_validation().copy()
 
 
     # Scale percentage
@@ -143,20 +266,34 @@ with tab3:
     # Create hover text column
     val_df["hover_text"] = (
         "<b>" + val_df["Country"] + "</b><br>" +
-        "SRI Data Number of Schools: " + val_df["OSM Number of Schools"].astype(str) + "<br>" +
-        "GOV Data Number of Schools: " + val_df["GOV Number of Schools "].astype(str) + "<br>" +
+        "SRI Data Number of Schools: " + val_df["OSM Number of Schools"].map("{:,.0f}".format) + "<br>" +
+        "GOV Data Number of Schools: " + val_df["GOV Number of Schools "].map("{:,.0f}".format) + "<br>" +
         "↳" + "<u>" + "Percent Covered: " + (val_df["PERCENT COVERED (%)"]).round(1).astype(str) + "%" + "</u>"
     )
 
 
-# === MAP ===
+    # === MAP ===
 
     st.markdown("<h5 style='margin-top:2rem;'>Cross-Validated Countries: Overview Map</h5>", unsafe_allow_html=True)
     st.markdown("The map below displays the sample of validation countries, their school counts in our data, their school counts in government data, and the coverage percentage indicator resulting from it. Hover over a country for detailed information.")
 
+    coverage_view = st.radio("Countries shown", ["Validation sample", "All countries (estimated)"], horizontal=True)
+    if coverage_view == "Validation sample":
+        map_df = val_df
+    else:
+        # Countries outside the sample take the median coverage of their region and income group
+        est = data.country_coverage_estimates()
+        map_df = est.assign(ISO3=est["GID"], **{"PERCENT COVERED (%)": est["coverage"] * 100})
+        map_df["hover_text"] = (
+            "<b>" + est.index + "</b><br>" +
+            "SRI Data Number of Schools: " + est["osm_schools"].map("{:,.0f}".format) + "<br>" +
+            "↳" + "<u>" + "Percent Covered: " + map_df["PERCENT COVERED (%)"].round(1).astype(str) + "%" + "</u><br>" +
+            "Based on: " + est["source"]
+        )
+
     # Choropleth
     fig = px.choropleth(
-        val_df,
+        map_df,
         locations="ISO3",  # ISO-3 country codes
         color="PERCENT COVERED (%)",
         locationmode="ISO-3",
@@ -191,24 +328,17 @@ with tab3:
     st.plotly_chart(fig, use_container_width=True)
 
 
-# === GRAPHS ===
-
-    from plotly.subplots import make_subplots
-    import plotly.graph_objects as go
+    # === GRAPHS ===
 
     st.markdown("<h5 style='margin-top:2rem;'>Validation Coverage Breakdown</h5>", unsafe_allow_html=True)
     st.markdown("The graphs below display the average percentage to which the SRI school numbers cover official government school numbers, by world region and by World Bank income group.")
 
-    # Clean + prepare data
-    val_df["Region"] = val_df["Region"].str.strip().str.title()
-    val_df["Income Group"] = val_df["Income Group"].str.strip().str.title()
-
     # === Averages ===
     region_avg = val_df.groupby("Region")["PERCENT COVERED (%)"].mean().sort_values(ascending=False).reset_index()
     income_avg = val_df.groupby("Income Group")["PERCENT COVERED (%)"].mean().sort_values(ascending=False).reset_index()
 
     # === Side-by-side chart setup ===
-    fig = make_subplots(
+    fig = subplots.make_subplots(
         rows=1, cols=2,
         shared_yaxes=True,
         horizontal_spacing=0.08,
@@ -247,4 +377,9 @@ with tab3:
         showlegend=False
     )
 
-    st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
\ No newline at end of file
+    st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
+
+
+with tab3:
+    if tab3.open:
+        data_validation()
\ No newline at end of file
@@ -1,7 +1,12 @@
 import streamlit as st
-import folium
-from streamlit_folium import st_folium
-import pandas as pd
+
+from sri.lazy import lazy_import
+
+# Heavy modules load on first use, i.e. only when the hazard maps tab is open
+folium = lazy_import("folium")
+streamlit_folium = lazy_import("streamlit_folium")
+tiles = lazy_import("sri.tiles")
+pyramid = lazy_import("sri.pyramid")
 
 # Page config
 st.set_page_config(
@@ -21,7 +26,8 @@ st.title("School Risk Index: Hazard Data")
 
 # ===========================
 # TABS
-tab1, tab2 = st.tabs(["OVERVIEW", "HAZARD MAPS"])
+# (on_change="rerun" lets the maps tab skip its work while it isn't open)
+tab1, tab2 = st.tabs(["OVERVIEW", "HAZARD MAPS"], on_change="rerun")
 
 
 # ===========================
@@ -92,8 +98,10 @@ with tab1:
 
 # ===========================
 # TAB 2 — Hazard maps
+# (a fragment: switching layers reruns only this tab)
 
-with tab2:
+@st.fragment
+def hazard_maps():
     st.markdown("##### Hazard Maps")
     st.markdown("The maps below show the global hazard rasters used to overlay with the school location data. The first map is an overlay of all six hazard rasters. Switch between rasters using the toggles above the map.")
 
@@ -104,15 +112,13 @@ with tab2:
         horizontal=True
     )
 
-    # Tile URLs
-    tile_urls = {
-        "OVERLAY": "https://tiles.arcgis.com/tiles/OO2s4OoyCZkYJ6oE/arcgis/rest/services/OverlayMap_V1/MapServer/tile/{z}/{y}/{x}",
-        "Water Scarcity": "https://tiles.arcgis.com/tiles/OO2s4OoyCZkYJ6oE/arcgis/rest/services/WaterScarcity_V4/MapServer/tile/{z}/{y}/{x}",
-        "Riverine Flooding": "https://tiles.arcgis.com/tiles/OO2s4OoyCZkYJ6oE/arcgis/rest/services/RiverineFlooding_V1/MapServer/tile/{z}/{y}/{x}",
-        "Coastal Flooding": "https://tiles.arcgis.com/tiles/OO2s4OoyCZkYJ6oE/arcgis/rest/services/CoastalFlooding_V2/MapServer/tile/{z}/{y}/{x}",
-        "Tropical Cyclones": "https://tiles.arcgis.com/tiles/OO2s4OoyCZkYJ6oE/arcgis/rest/services/TropicalCyclones_V2/MapServer/tile/{z}/{y}/{x}",
-        "Air Pollution": "https://tiles.arcgis.com/tiles/OO2s4OoyCZkYJ6oE/arcgis/rest/services/AirPollution_V1/MapServer/tile/{z}/{y}/{x}"
-    }
+    # Tile URLs (through the caching tile proxy when SRI_TILE_PROXY_URL is set, see sri/tiles.py)
+    tile_urls = tiles.tile_urls()
+
+    # Heatwaves has no tile service: use the locally built pyramid when present (python -m sri.pyramid)
+    heatwaves_url = pyramid.pyramid_url("Heatwaves")
+    if heatwaves_url:
+        tile_urls["Heatwaves"] = heatwaves_url
 
     # === LEGEND HTML ===
 
@@ -189,25 +195,32 @@ with tab2:
 
     # === CONDITIONAL DISPLAY ===
 
-    if layer_choice != "Heatwaves":
-        # Folium map for other layers
+    if layer_choice in tile_urls:
+        # Folium map for tiled layers
         m = folium.Map(location=[0, 0], zoom_start=1.5, tiles="CartoDB positron", control_scale=True)
 
         folium.TileLayer(
             tiles=tile_urls[layer_choice],
             name=layer_choice,
-            attr="Esri",
+            attr="Berkeley Earth" if layer_choice == "Heatwaves" else "Esri",
             overlay=True,
-            control=False
+            control=False,
+            max_native_zoom=pyramid.max_native_zoom(layer_choice)
         ).add_to(m)
 
-        st_folium(m, height=600, use_container_width=True)
+        streamlit_folium.st_folium(m, height=600, use_container_width=True)
 
     else:
-        # Static image for Heatwaves
+        # Static image for Heatwaves if its tile pyramid hasn't been built
         st.image(
             "images/heatwaves.png",
             use_container_width=True,
             caption="Due to its different cell size, the heatwaves raster can only be displayed as a static image on this dashboard."
         )
 
+
+with tab2:
+    if tab2.open:
+        hazard_maps()
+
+
@@ -0,0 +1 @@
+"""Data processing helpers shared by the School Risk Index dashboard pages."""
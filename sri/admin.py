@@ -0,0 +1,145 @@
+"""Sub-national (admin-1) School Risk Index.
+
+Every school in the store is assigned to the admin-1 polygon that contains it.
+Schools are processed in chunks spread over a process pool. Each worker loads
+the polygons once, builds a shapely ``STRtree`` over the points of a chunk and
+queries it with all polygons using ``predicate="contains"``, which evaluates
+prepared polygons against only the nearby points. The exposure counts per
+province are then scored exactly like the national index (see
+``sri.pipeline.score``), with min-max scaling across provinces instead of
+countries.
+
+Polygons come from a local file readable by geopandas, e.g. GADM level 1
+(``GID_0``/``GID_1``/``NAME_1``, the defaults) or geoBoundaries ADM1::
+
+    python -m sri.admin data/gadm_410-levels.gpkg --layer ADM_1 --workers 4
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from sri.hazards import HAZARD_COLUMNS
+from sri.pipeline import SUBINDEX_COLUMNS, aggregate_sri, categorize, combine_subindices, count_exposure, hazard_indicators, stage
+from sri.store import STORE_DIR, list_countries, load_country
+
+
+ADMIN1_SRI_CSV = "data/admin1_SRI.csv"
+ADMIN1_GEOJSON = "data/admin1_SRI.geojson"
+
+CHUNK_SIZE = 50_000
+SIMPLIFY_DEG = 0.02  # tolerance of the polygons written for the map
+
+_polygons = None  # admin-1 geometries, loaded once per worker process
+
+
+###########################
+# Point-in-polygon assignment
+
+def read_polygons(path, layer=None, id_col="GID_1", name_col="NAME_1", iso_col="GID_0"):
+    """Admin-1 polygons from a local file as a GeoDataFrame with ``admin1_id``, ``admin1_name`` and ``GID`` columns."""
+    import geopandas as gpd
+
+    gdf = gpd.read_file(path, layer=layer, columns=[id_col, name_col, iso_col])
+    gdf = gdf.rename(columns={id_col: "admin1_id", name_col: "admin1_name", iso_col: "GID"}).to_crs(4326)
+    return gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty].reset_index(drop=True)
+
+
+def _init_worker(geometries):
+    global _polygons
+    import shapely
+
+    _polygons = geometries
+    shapely.prepare(_polygons)
+
+
+def _assign_chunk(lonlat):
+    """Index of the containing polygon for each point of a chunk, -1 where none contains it."""
+    import shapely
+
+    points = shapely.points(lonlat[0], lonlat[1])
+    polygon_idx, point_idx = shapely.STRtree(points).query(_polygons, predicate="contains")
+    # Points on a shared border go to the first polygon
+    owner = np.full(len(points), len(_polygons), dtype=np.int64)
+    np.minimum.at(owner, point_idx, polygon_idx)
+    owner[owner == len(_polygons)] = -1
+    return owner
+
+
+def assign_admin1(lon, lat, geometries, workers=1, chunk_size=CHUNK_SIZE):
+    """Position in ``geometries`` of the polygon containing each point (-1 for none)."""
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.asarray(lat, dtype="float64")
+    chunks = [(lon[i:i + chunk_size], lat[i:i + chunk_size]) for i in range(0, len(lon), chunk_size)]
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(geometries,)) as pool:
+            parts = list(pool.map(_assign_chunk, chunks))
+    else:
+        _init_worker(geometries)
+        parts = [_assign_chunk(c) for c in chunks]
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+
+###########################
+# Scoring
+
+def load_schools(store=STORE_DIR):
+    """Locations and hazard flags of all schools, country by country so chunks stay spatially compact."""
+    frames = [load_country(c, columns=["lon", "lat"] + HAZARD_COLUMNS, store=store) for c in list_countries(store)["Country"]]
+    schools = pd.concat(frames, ignore_index=True)
+    return schools[schools["lon"].notna() & schools["lat"].notna()]
+
+
+def score_admin1(counts, polygons):
+    """Admin-1 SRI table, scored like ``sri.pipeline.score`` across provinces."""
+    sub = combine_subindices(hazard_indicators(counts))
+    out = sub.round(2)
+    out["SRI"] = aggregate_sri(sub).round(2)
+    out["SRI_category"], out["SRI_ncategory"] = categorize(out["SRI"])
+    out["n_schools"] = counts["n_schools"]
+    meta = polygons[["admin1_id", "admin1_name", "GID"]].drop_duplicates("admin1_id")
+    out = meta.merge(out, left_on="admin1_id", right_index=True)
+    return out[["admin1_id", "admin1_name", "GID", "n_schools", "SRI", "SRI_ncategory", "SRI_category"] + SUBINDEX_COLUMNS].reset_index(drop=True)
+
+
+def write_geojson(polygons, ids, path=ADMIN1_GEOJSON, tolerance=SIMPLIFY_DEG):
+    """Simplified polygons of the scored provinces, keyed by ``properties.admin1_id``."""
+    shapes = polygons[polygons["admin1_id"].isin(ids)][["admin1_id", "geometry"]].dissolve("admin1_id").reset_index()
+    shapes["geometry"] = shapes.geometry.simplify(tolerance, preserve_topology=True)
+    with open(path, "w") as f:
+        f.write(shapes.to_json(drop_id=True))
+
+
+def run(polygon_path, layer=None, id_col="GID_1", name_col="NAME_1", iso_col="GID_0", out=ADMIN1_SRI_CSV, workers=1):
+    timings = {}
+    with stage("polygons", timings):
+        polygons = read_polygons(polygon_path, layer, id_col, name_col, iso_col)
+    with stage("schools", timings):
+        schools = load_schools()
+    with stage("assign", timings):
+        owner = assign_admin1(schools["lon"], schools["lat"], polygons.geometry.values, workers)
+        schools["admin1_id"] = polygons["admin1_id"].to_numpy()[owner]
+        schools = schools[owner >= 0]
+    with stage("score", timings):
+        result = score_admin1(count_exposure(schools, by="admin1_id"), polygons)
+    with stage("write", timings):
+        result.to_csv(out, index=False, float_format="%.2f")
+        write_geojson(polygons, result["admin1_id"], os.path.splitext(out)[0] + ".geojson")
+    print(f"Assigned {len(schools):,} schools to {len(result):,} provinces, wrote {out} ({sum(timings.values()):.2f}s total)")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("polygons", help="admin-1 polygon file (GeoPackage, shapefile, GeoJSON, ...)")
+    parser.add_argument("--layer", default=None)
+    parser.add_argument("--id-col", default="GID_1")
+    parser.add_argument("--name-col", default="NAME_1")
+    parser.add_argument("--iso-col", default="GID_0")
+    parser.add_argument("--out", default=ADMIN1_SRI_CSV)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    run(args.polygons, args.layer, args.id_col, args.name_col, args.iso_col, args.out, args.workers)
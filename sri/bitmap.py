@@ -0,0 +1,138 @@
+"""Bitmap index over all schools for multi-hazard filtering.
+
+Schools are laid out in one global order, sorted by region and then country.
+Each country's block is zero-padded to a whole number of bytes. Each hazard
+column is then one packed bitset (one bit per school, ~165 KB for 1.3M schools).
+Countries and regions don't need bitsets of their own: they are byte ranges of
+that order, which is the run-length-compressed form of their bitsets. A query
+such as "Riverine Flooding AND Cyclones Cat 3+ in South Asia" is a bitwise AND
+of two packed arrays followed by a popcount over one byte range::
+
+    python -m sri.bitmap      # build data/cache/bitmap_index.npz
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from sri.hazards import HAZARD_BITS, HAZARD_COLUMNS, encode_hazards
+from sri.store import STORE_DIR, list_countries, load_country, store_version
+
+
+INDEX_PATH = "data/cache/bitmap_index.npz"
+UNASSIGNED = "Unassigned"  # region of store countries missing from the country table
+
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class BitmapIndex:
+    """Packed hazard bitsets plus byte ranges of every country and region."""
+
+    def __init__(self, bitsets, countries, regions, offsets, sizes, version):
+        self.bitsets = bitsets              # (n_hazards, n_bytes) uint8, bit order as np.packbits
+        self.countries = list(countries)    # in index order
+        self.regions = list(regions)        # region of each country
+        self.offsets = np.asarray(offsets)  # byte offset of each country's block, plus the end
+        self.sizes = np.asarray(sizes)      # schools per country (without padding)
+        self.version = version
+        self._country_pos = {c: i for i, c in enumerate(self.countries)}
+
+    # ---- construction
+
+    @classmethod
+    def build(cls, region_of, store=STORE_DIR):
+        """Build from the store; ``region_of`` maps country name to region."""
+        manifest = list_countries(store)
+        manifest["region"] = manifest["Country"].map(region_of).fillna(UNASSIGNED)
+        manifest = manifest.sort_values(["region", "Country"], ignore_index=True)
+
+        blocks, offsets = [], [0]
+        for country in manifest["Country"]:
+            mask = encode_hazards(load_country(country, columns=HAZARD_COLUMNS, store=store))
+            flags = (mask[None, :] & HAZARD_BITS[:, None]) > 0
+            blocks.append(np.packbits(flags, axis=1))  # pads the block to whole bytes
+            offsets.append(offsets[-1] + blocks[-1].shape[1])
+
+        bitsets = np.concatenate(blocks, axis=1) if blocks else np.zeros((len(HAZARD_COLUMNS), 0), np.uint8)
+        return cls(bitsets, manifest["Country"], manifest["region"], offsets, manifest["n_schools"], store_version(store))
+
+    def save(self, path=INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path, bitsets=self.bitsets, countries=np.array(self.countries, dtype=object), regions=np.array(self.regions, dtype=object),
+                 offsets=self.offsets, sizes=self.sizes, version=self.version)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        f = np.load(path, allow_pickle=True)
+        return cls(f["bitsets"], f["countries"], f["regions"], f["offsets"], f["sizes"], str(f["version"]))
+
+    # ---- queries
+
+    def match(self, hazards=(), mode="all"):
+        """Packed bitset of schools exposed to all (``mode="all"``) or any of ``hazards``.
+
+        With no hazards every school matches.
+        """
+        rows = [self.bitsets[HAZARD_COLUMNS.index(h)] for h in hazards]
+        if not rows:
+            return self._all_schools()
+        combine = np.bitwise_and if mode == "all" else np.bitwise_or
+        return combine.reduce(rows)
+
+    def _all_schools(self):
+        bits = np.zeros(self.bitsets.shape[1], dtype=np.uint8)
+        for start, n in zip(self.offsets[:-1], self.sizes):
+            bits[start:start + n // 8] = 0xFF
+            if n % 8:
+                bits[start + n // 8] = (0xFF << (8 - n % 8)) & 0xFF
+        return bits
+
+    def count(self, bits):
+        return int(POPCOUNT[bits].sum(dtype=np.int64))
+
+    def count_by_country(self, bits):
+        """Matching schools per country."""
+        per_byte = POPCOUNT[bits].astype(np.int64)
+        totals = np.add.reduceat(per_byte, self.offsets[:-1]) if len(per_byte) else np.zeros(0, np.int64)
+        # reduceat returns the element itself for empty ranges
+        totals[self.offsets[:-1] == self.offsets[1:]] = 0
+        return pd.Series(totals, index=self.countries, name="schools")
+
+    def count_by_region(self, bits):
+        """Matching schools per region."""
+        by_country = self.count_by_country(bits)
+        return by_country.groupby(self.regions, sort=False).sum()
+
+    def region(self, country):
+        return self.regions[self._country_pos[country]]
+
+    def country_rows(self, bits, country):
+        """Positions of matching schools within ``load_country(country)``."""
+        i = self._country_pos[country]
+        block = np.unpackbits(bits[self.offsets[i]:self.offsets[i + 1]])[: self.sizes[i]]
+        return np.flatnonzero(block)
+
+
+def load_index(region_of, path=INDEX_PATH, store=STORE_DIR):
+    """The persisted index if it matches the store and ``region_of``, otherwise a freshly built and saved one."""
+    if os.path.exists(path):
+        index = BitmapIndex.load(path)
+        regions = pd.Series(index.countries).map(region_of).fillna(UNASSIGNED)
+        if index.version == store_version(store) and regions.tolist() == index.regions:
+            return index
+    index = BitmapIndex.build(region_of, store)
+    index.save(path)
+    return index
+
+
+if __name__ == "__main__":
+    from sri.pipeline import COUNTRIES_CSV
+
+    meta = pd.read_csv(COUNTRIES_CSV, usecols=["COUNTRY", "REGION"])
+    start = time.perf_counter()
+    index = BitmapIndex.build(meta.set_index("COUNTRY")["REGION"].str.strip().str.title())
+    index.save()
+    print(f"Indexed {int(index.sizes.sum()):,} schools in {len(index.countries)} countries "
+          f"({index.bitsets.nbytes / 1024:.0f} KB of bitsets) to {INDEX_PATH} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,112 @@
+"""School coverage of the OSM data, measured against government school counts.
+
+``data/schools_validation.csv`` holds the government school counts of the
+validation sample, with the OSM count and ``PERCENT COVERED`` typed in by hand.
+Here the OSM count of every country comes from the school store instead: the
+store manifest already holds the schools per partition, so one grouped sum by
+ISO3 (``GID`` in the country table) gives all counts without reading any
+school data. Coverage is the live OSM count over the government count.
+
+Countries outside the sample get an estimate from the sample: the median
+coverage of their World Bank region and income group, then of their income
+group, then of all validated countries. Estimates are capped at 1, since a
+country cannot be more than fully mapped (measured coverage above 1 comes from
+OSM counting schools the government count leaves out)::
+
+    python -m sri.coverage
+"""
+
+import numpy as np
+import pandas as pd
+
+from sri.pipeline import COUNTRIES_CSV, META_COLUMNS
+from sri.store import STORE_DIR, list_countries
+
+
+VALIDATION_CSV = "data/schools_validation.csv"
+
+OSM_COLUMN = "OSM Number of Schools"
+GOV_COLUMN = "GOV Number of Schools "  # sic, trailing space in the source table
+
+# Fallback strata for countries without a government count, most specific first
+STRATA = {
+    "Region and income group median": ["REGION", "INCOME GROUP"],
+    "Income group median": ["INCOME GROUP"],
+}
+
+
+def parse_count(values):
+    """Numbers from counts written with thousands separators ("144,319")."""
+    return pd.to_numeric(pd.Series(values).astype(str).str.replace(",", "", regex=False), errors="coerce")
+
+
+def osm_counts(meta, store=STORE_DIR):
+    """Schools in the store per ISO3, for the store countries found in ``meta``."""
+    manifest = list_countries(store)
+    iso3 = manifest["Country"].map(meta.set_index("COUNTRY")["GID"])
+    return manifest["n_schools"].groupby(iso3).sum()
+
+
+def validated_coverage(validation, osm):
+    """The validation table with OSM counts from the store and ``PERCENT COVERED`` recomputed.
+
+    Sample countries without a store partition keep their recorded OSM count.
+    """
+    out = validation.copy()
+    recorded = parse_count(out[OSM_COLUMN])
+    out[OSM_COLUMN] = out["ISO3"].map(osm).fillna(recorded)
+    out[GOV_COLUMN] = parse_count(out[GOV_COLUMN])
+    out["PERCENT COVERED"] = (out[OSM_COLUMN] / out[GOV_COLUMN].where(out[GOV_COLUMN] > 0)).round(2)
+    return out
+
+
+def estimate_coverage(meta, validated):
+    """Share of each country's schools mapped in OSM, capped at 1, and where the figure comes from.
+
+    Indexed by ``COUNTRY``, with ``coverage`` and ``source`` columns.
+    """
+    measured = validated.set_index("ISO3")["PERCENT COVERED"].dropna().clip(upper=1.0)
+    measured = measured[~measured.index.duplicated()]
+    coverage = meta["GID"].map(measured)
+    source = pd.Series(np.where(coverage.notna(), "Government count", None), index=meta.index, dtype=object)
+    for label, keys in STRATA.items():
+        filled = coverage.fillna(coverage.groupby([meta[k] for k in keys]).transform("median"))
+        source[coverage.isna() & filled.notna()] = label
+        coverage = filled
+    source[coverage.isna()] = "Overall median"
+    coverage = coverage.fillna(measured.median())
+    return pd.DataFrame({"coverage": coverage.to_numpy(), "source": source.to_numpy()}, index=meta["COUNTRY"].to_numpy())
+
+
+def country_coverage(meta, validation, store=STORE_DIR):
+    """Validation table and coverage estimates of all countries in ``meta``, from the live store."""
+    osm = osm_counts(meta, store)
+    validated = validated_coverage(validation, osm)
+    estimates = estimate_coverage(meta, validated)
+    estimates.insert(0, "GID", meta["GID"].to_numpy())
+    estimates.insert(1, "osm_schools", meta["GID"].map(osm).fillna(0).astype("int64").to_numpy())
+    return validated, estimates
+
+
+def load_meta(path=COUNTRIES_CSV):
+    """Country table columns used for coverage, with region and income group names normalized."""
+    meta = pd.read_csv(path, usecols=META_COLUMNS + ["SRI"])
+    for col in ["REGION", "INCOME GROUP"]:
+        meta[col] = meta[col].str.strip().str.title()
+    return meta
+
+
+if __name__ == "__main__":
+    validation = pd.read_csv(VALIDATION_CSV)
+    validated, estimates = country_coverage(load_meta(), validation)
+    report = pd.DataFrame({
+        "Country": validated["Country"],
+        "recorded": validation["PERCENT COVERED"],
+        "live": validated["PERCENT COVERED"],
+    })
+    changed = report[~np.isclose(report["recorded"], report["live"], equal_nan=True)]
+    print(f"{len(changed)} of {len(report)} validated countries changed coverage since the table was written")
+    if len(changed):
+        print(changed.to_string(index=False))
+    print()
+    print(estimates["source"].value_counts().to_string())
@@ -0,0 +1,99 @@
+"""Precomputed aggregate cube of the country SRI table.
+
+Counts countries per SRI category for the SRI and each hazard sub-index, for
+every grouping set of the dimensions (overall, by region, by income group, by
+region and income group), together with the share of each category within its
+group. The cube is built once per data version, persisted as a Feather file,
+and every chart slice afterwards is a dictionary lookup.
+"""
+
+import itertools
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from sri.pipeline import SRI_BINS, SRI_CATEGORIES, SUBINDEX_COLUMNS
+
+
+DIMENSIONS = ["REGION", "INCOME GROUP"]
+MEASURES = ["SRI"] + SUBINDEX_COLUMNS
+ALL = "All"  # dimension value of rolled-up rows
+
+
+def categories(df, measure):
+    """SRI category of every country for ``measure``."""
+    if measure == "SRI":
+        return df["SRI_category"]
+    return pd.cut(df[measure], SRI_BINS, labels=SRI_CATEGORIES, right=True).astype(object)
+
+
+def build_cube(df):
+    """Long table of country counts and shares per measure, grouping set and category."""
+    parts = []
+    for measure in MEASURES:
+        keyed = df[DIMENSIONS].assign(category=categories(df, measure))
+        for n in range(len(DIMENSIONS) + 1):
+            for dims in itertools.combinations(DIMENSIONS, n):
+                counts = keyed.groupby([*dims, "category"]).size().rename("count").reset_index()
+                totals = counts.groupby(list(dims))["count"].transform("sum") if dims else counts["count"].sum()
+                counts["share"] = counts["count"] / totals
+                for dim in DIMENSIONS:
+                    if dim not in dims:
+                        counts[dim] = ALL
+                counts["measure"] = measure
+                parts.append(counts)
+    return pd.concat(parts, ignore_index=True)[["measure", *DIMENSIONS, "category", "count", "share"]]
+
+
+class Cube:
+    """Slices of a built cube, pivoted once up front and looked up by (measure, dimensions).
+
+    Returned frames are shared between callers: do not modify them.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._slices = {}
+        for measure, rows in table.groupby("measure", sort=False):
+            for n in range(len(DIMENSIONS) + 1):
+                for dims in itertools.combinations(DIMENSIONS, n):
+                    mask = pd.Series(True, index=rows.index)
+                    for dim in DIMENSIONS:
+                        mask &= (rows[dim] != ALL) if dim in dims else (rows[dim] == ALL)
+                    for value in ["count", "share"]:
+                        self._slices[measure, dims, value] = self._pivot(rows[mask], dims, value)
+
+    @staticmethod
+    def _pivot(rows, dims, value):
+        if not dims:
+            return rows.set_index("category")[value]
+        return rows.pivot_table(index=list(dims), columns="category", values=value, fill_value=0, observed=True)
+
+    def counts(self, measure="SRI", by=()):
+        """Country counts per category, one row per group of ``by``."""
+        return self._slices[measure, _dims(by), "count"]
+
+    def shares(self, measure="SRI", by=()):
+        """Share of each category within each group of ``by``; rows sum to 1."""
+        return self._slices[measure, _dims(by), "share"]
+
+
+def _dims(by):
+    # Grouping sets are keyed in DIMENSIONS order
+    by = {by} if isinstance(by, str) else set(by)
+    return tuple(d for d in DIMENSIONS if d in by)
+
+
+def load_cube(df, version, cache_dir):
+    """Cube for ``df`` at data ``version``, read from ``cache_dir`` or built and persisted there."""
+    path = os.path.join(cache_dir, f"cube-{version}.arrow")
+    if os.path.exists(path):
+        return Cube(feather.read_table(path).to_pandas())
+
+    table = build_cube(df)
+    os.makedirs(cache_dir, exist_ok=True)
+    feather.write_feather(pa.Table.from_pandas(table, preserve_index=False), path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return Cube(table)
@@ -0,0 +1,206 @@
+"""Process-wide data access for the dashboard pages.
+
+Every dataset is loaded once per server process with ``st.cache_resource`` and
+the same object is handed to every session and rerun, instead of each page
+re-parsing files (or ``st.cache_data`` pickling a fresh copy per caller). The
+tabular inputs are converted once to uncompressed Arrow IPC (Feather) files in
+``CACHE_DIR`` and memory-mapped, so reruns and new processes skip CSV parsing
+and the numeric columns are backed by the page cache rather than private heap.
+
+The returned DataFrames are shared: treat them as read-only and ``.copy()``
+before modifying.
+"""
+
+import hashlib
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import streamlit as st
+
+from sri.bitmap import load_index
+from sri.coverage import VALIDATION_CSV, country_coverage
+from sri.cube import load_cube
+from sri.lod import exposure_colors, grid_aggregate
+from sri.scenario import WeightScenario
+from sri.schema import compact_schools
+from sri.spatial import load_grid
+from sri.store import STORE_DIR, list_countries, load_country, store_version
+from sri.uncertainty import UNCERTAINTY_CSV
+
+
+COUNTRIES_CSV = "countries_SRI_simplified_inclWBdata.csv"
+CACHE_DIR = "data/cache"
+
+
+###########################
+# Memory-mapped Arrow tables
+
+def mapped_table(src, read=pd.read_csv):
+    """Memory-mapped Arrow table of ``src``, converted to Feather in ``CACHE_DIR`` when missing or stale."""
+    dest = os.path.join(CACHE_DIR, os.path.basename(src) + ".arrow")
+    if not os.path.exists(dest) or os.path.getmtime(dest) < os.path.getmtime(src):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Parse with pandas so dtypes match what the pages always got from read_csv
+        table = pa.Table.from_pandas(read(src), preserve_index=False)
+        feather.write_feather(table, dest + ".tmp", compression="uncompressed")
+        os.replace(dest + ".tmp", dest)
+    return feather.read_table(dest, memory_map=True)
+
+
+def data_version(path):
+    """Short content hash of a source file, for keying derived caches."""
+    return _file_hash(path, os.path.getmtime(path))
+
+
+@st.cache_resource
+def _file_hash(path, mtime):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+@st.cache_resource
+def _text_file(path, version):
+    with open(path) as f:
+        return f.read()
+
+
+def text_file(path):
+    """Contents of a static text file such as an exported HTML map, re-read only when it changes."""
+    return _text_file(path, data_version(path))
+
+
+def _shared_frame(table):
+    # split_blocks avoids consolidating columns into new 2D blocks, so numeric columns can stay views
+    return table.to_pandas(split_blocks=True)
+
+
+def _tidy_groups(df, columns):
+    for col in columns:
+        df[col] = df[col].str.strip().str.title()
+    return df
+
+
+###########################
+# Datasets
+
+@st.cache_resource(max_entries=1)
+def _countries(version):
+    return _tidy_groups(_shared_frame(mapped_table(COUNTRIES_CSV)), ["REGION", "INCOME GROUP"])
+
+
+def countries():
+    """Country-level SRI table, with region and income group names normalized."""
+    return _countries(data_version(COUNTRIES_CSV))
+
+
+@st.cache_resource
+def _sri_cube(version):
+    return load_cube(_countries(version), version, CACHE_DIR)
+
+
+def sri_cube():
+    """Aggregate cube of SRI categories by region and income group for the current country data."""
+    return _sri_cube(data_version(COUNTRIES_CSV))
+
+
+@st.cache_resource
+def _sri_uncertainty(version):
+    return _shared_frame(mapped_table(UNCERTAINTY_CSV))
+
+
+def sri_uncertainty():
+    """Bootstrap SRI intervals per country (``python -m sri.uncertainty``), or None before they are computed."""
+    if not os.path.exists(UNCERTAINTY_CSV):
+        return None
+    return _sri_uncertainty(data_version(UNCERTAINTY_CSV))
+
+
+@st.cache_resource
+def _weight_scenario(version):
+    return WeightScenario(_countries(version))
+
+
+@st.cache_resource(max_entries=128)
+def _scenario_countries(version, weights):
+    return _weight_scenario(version).table(weights)
+
+
+def scenario_countries(weights):
+    """Country table with the SRI recomputed for hazard ``weights`` (a tuple in ``SUBINDEX_COLUMNS`` order), memoized per weight vector."""
+    return _scenario_countries(data_version(COUNTRIES_CSV), tuple(float(w) for w in weights))
+
+
+@st.cache_resource
+def _school_coverage(version):
+    validation = _tidy_groups(_shared_frame(mapped_table(VALIDATION_CSV)), ["Region", "Income Group"])
+    return country_coverage(_countries(version[0]), validation)
+
+
+def _coverage_version():
+    return data_version(COUNTRIES_CSV), data_version(VALIDATION_CSV), store_version()
+
+
+def school_validation():
+    """Government cross-validation, with OSM school counts and coverage recomputed from the school store."""
+    return _school_coverage(_coverage_version())[0]
+
+
+def country_coverage_estimates():
+    """OSM coverage of every country: measured where validated, otherwise the median of its region and income group."""
+    return _school_coverage(_coverage_version())[1]
+
+
+@st.cache_resource(max_entries=1)
+def _school_countries(version):
+    return list_countries(STORE_DIR)
+
+
+def school_countries():
+    """Countries in the school store with their school counts."""
+    return _school_countries(store_version(STORE_DIR))
+
+
+@st.cache_resource(max_entries=32)
+def _country_schools(version, country):
+    return compact_schools(load_country(country))
+
+
+def country_schools(country):
+    """Schools of one country in the compact schema of ``sri.schema`` (float32 coordinates, hazard bitmasks, categorical labels)."""
+    return _country_schools(store_version(STORE_DIR), country)
+
+
+@st.cache_resource(max_entries=32)
+def _country_grid(version, country):
+    schools = _country_schools(version, country)
+    grid = grid_aggregate(schools["lon"], schools["lat"], schools["hazard_mask"])
+    grid["color"] = exposure_colors(grid["share_exposed"])
+    return grid
+
+
+def country_grid(country):
+    """Grid aggregate of a country's schools for the level-of-detail map."""
+    return _country_grid(store_version(STORE_DIR), country)
+
+
+@st.cache_resource(max_entries=1)
+def _hazard_index(version):
+    region_of = _countries(version[1]).set_index("COUNTRY")["REGION"]
+    return load_index(region_of[~region_of.index.duplicated()])
+
+
+def hazard_index():
+    """Bitmap index of hazard exposure over all schools in the store, grouped by the regions of the country table."""
+    return _hazard_index((store_version(STORE_DIR), data_version(COUNTRIES_CSV)))
+
+
+@st.cache_resource(max_entries=1)
+def _school_grid(version):
+    return load_grid()
+
+
+def school_grid():
+    """Grid index of all school locations for viewport queries."""
+    return _school_grid(store_version(STORE_DIR))
@@ -0,0 +1,66 @@
+"""School coverage overview rendered as a density image.
+
+Bins every school's lon/lat from the partitioned store into a 2D histogram on
+a plate carrée grid, streaming record batches so memory is bounded by the grid,
+and colors the counts on a log scale. The result is a small transparent PNG
+that replaces the embedded HTML map on the School Data page::
+
+    python -m sri.density [--width 2000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pyarrow.dataset as ds
+from PIL import Image
+
+from sri.store import STORE_DIR
+
+
+OVERVIEW_PNG = "images/schools_overview.png"
+
+# Light to dark green, ending on the school point color of the country explorer
+COLOR_STOPS = [(0.0, (199, 233, 192)), (0.5, (65, 171, 93)), (1.0, (0, 90, 50))]
+
+
+def school_histogram(store=STORE_DIR, width=2000, batch_size=500_000):
+    """School counts on a ``width`` x ``width / 2`` grid covering the world, north up."""
+    height = width // 2
+    counts = np.zeros((height, width), dtype=np.int64)
+    scanner = ds.dataset(store, format="parquet", partitioning="hive").scanner(columns=["lon", "lat"], batch_size=batch_size)
+    for batch in scanner.to_batches():
+        lon = batch.column("lon").to_numpy(zero_copy_only=False)
+        lat = batch.column("lat").to_numpy(zero_copy_only=False)
+        located = np.isfinite(lon) & np.isfinite(lat)  # null coordinates come through as NaN
+        lon, lat = lon[located], lat[located]
+        col = np.clip(((lon + 180) / 360 * width).astype(np.int64), 0, width - 1)
+        row = np.clip(((90 - lat) / 180 * height).astype(np.int64), 0, height - 1)
+        counts += np.bincount(row * width + col, minlength=width * height).reshape(height, width)
+    return counts
+
+
+def colorize(counts):
+    """RGBA image of ``counts`` on a log color scale; empty cells are transparent."""
+    level = np.log1p(counts) / np.log1p(max(counts.max(), 1))
+    stops = np.array([s for s, _ in COLOR_STOPS])
+    colors = np.array([c for _, c in COLOR_STOPS], dtype="float64")
+    rgb = np.stack([np.interp(level, stops, colors[:, i]) for i in range(3)], axis=-1)
+    alpha = np.where(counts > 0, 255, 0)
+    return np.dstack([rgb, alpha]).round().astype(np.uint8)
+
+
+def render_overview(out=OVERVIEW_PNG, store=STORE_DIR, width=2000):
+    counts = school_histogram(store, width)
+    Image.fromarray(colorize(counts)).quantize(64, method=Image.Quantize.FASTOCTREE).save(out, optimize=True)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=OVERVIEW_PNG)
+    parser.add_argument("--width", type=int, default=2000)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    counts = render_overview(args.out, width=args.width)
+    print(f"Binned {counts.sum():,} schools into {args.out} ({time.perf_counter() - start:.1f}s)")
@@ -0,0 +1,166 @@
+"""Hazard exposure of schools from local GeoTIFF hazard rasters.
+
+Recomputes the eight 0/1 hazard flags of the school data by sampling one
+raster per hazard source at every school location and applying the exposure
+thresholds from the source table on the Hazard Data page (``HAZARD_RULES``).
+
+Sampling is block-wise. Points are mapped to raster rows and columns, grouped
+by the internal block (tile or strip) they fall in, and each block that holds
+schools is read exactly once with a windowed read. Blocks without schools are
+never touched. Each raster is sampled in its own worker process. Rasters are
+expected in ``RASTER_DIR`` as ``<source>.tif`` in any CRS (schools are
+reprojected). Cells that are nodata or outside the raster give a missing flag::
+
+    python -m sri.exposure [--rasters data/hazards] [--workers 5] [--compare]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from sri.hazards import HAZARD_COLUMNS
+from sri.pipeline import stage
+from sri.store import STORE_DIR, list_countries, load_country
+
+
+RASTER_DIR = "data/hazards"
+EXPOSURE_PARQUET = "data/schools_exposure_local.parquet"
+
+# Hazard column -> (raster source, comparison, threshold), from the Hazard Data source table
+HAZARD_RULES = {
+    "Water Scarcity": ("water_scarcity", ">=", 2.0),          # Aqueduct composite, average score 2+
+    "Coastal Flooding": ("coastal_flooding", ">=", 3),        # Aqueduct risk category, High (3) or Extremely High (4)
+    "Riverine Flooding": ("riverine_flooding", ">=", 3),      # Aqueduct risk category, High (3) or Extremely High (4)
+    "Heatwaves": ("heatwaves", ">=", 9),                      # average annual heatwaves 2000-2024
+    "Cyclones Cat 1&2": ("cyclone_wind", ">=", 119),          # 100-year return period wind speed, km/h
+    "Cyclones Cat 3+": ("cyclone_wind", ">=", 178),
+    "PM2.5 above 9μg/m³": ("pm25", ">", 9),                   # annual mean PM2.5, μg/m³
+    "PM2.5 above 35μg/m³": ("pm25", ">", 35),
+}
+
+COMPARE = {">=": np.greater_equal, ">": np.greater}
+
+
+###########################
+# Block-wise sampling
+
+def raster_path(source, raster_dir=RASTER_DIR):
+    return os.path.join(raster_dir, f"{source}.tif")
+
+
+def sample_raster(path, lon, lat, band=1):
+    """Raster values at the given WGS84 points, NaN for nodata or outside the raster.
+
+    Reads each internal block that contains at least one point once.
+    """
+    import rasterio
+    from rasterio.warp import transform as reproject_points
+    from rasterio.windows import Window
+
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.asarray(lat, dtype="float64")
+    values = np.full(len(lon), np.nan)
+
+    with rasterio.open(path) as src:
+        x, y = lon, lat
+        if src.crs is not None and not src.crs.to_epsg() == 4326:
+            x, y = map(np.asarray, reproject_points("EPSG:4326", src.crs, lon, lat))
+        col, row = ~src.transform @ (x, y)
+        col, row = np.floor(col).astype(np.int64), np.floor(row).astype(np.int64)
+        inside = (row >= 0) & (row < src.height) & (col >= 0) & (col < src.width)
+
+        block_h, block_w = src.block_shapes[band - 1]
+        blocks_across = -(-src.width // block_w)
+        points = np.flatnonzero(inside)
+        if points.size == 0:
+            return values
+        block_id = (row[points] // block_h) * blocks_across + col[points] // block_w
+        order = np.argsort(block_id, kind="stable")
+        points, block_id = points[order], block_id[order]
+        starts = np.flatnonzero(np.r_[True, block_id[1:] != block_id[:-1]])
+
+        for start, stop in zip(starts, np.r_[starts[1:], len(points)]):
+            idx = points[start:stop]
+            r0 = (row[idx[0]] // block_h) * block_h
+            c0 = (col[idx[0]] // block_w) * block_w
+            window = Window(c0, r0, min(block_w, src.width - c0), min(block_h, src.height - r0))
+            block = src.read(band, window=window, masked=True)
+            sampled = block[row[idx] - r0, col[idx] - c0]
+            values[idx] = np.ma.filled(sampled.astype("float64"), np.nan)
+
+    return values
+
+
+def _sample_source(args):
+    source, path, lon, lat = args
+    start = time.perf_counter()
+    values = sample_raster(path, lon, lat)
+    return source, values, time.perf_counter() - start
+
+
+def compute_exposure(lon, lat, raster_dir=RASTER_DIR, rules=HAZARD_RULES, workers=1):
+    """The hazard flag columns (1/0, NaN where the raster has no data) for the given points.
+
+    Every raster source is sampled once, in parallel across ``workers`` processes,
+    and each hazard's threshold is applied to its source's values.
+    """
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.asarray(lat, dtype="float64")
+    sources = sorted({source for source, _, _ in rules.values()})
+    jobs = [(source, raster_path(source, raster_dir), lon, lat) for source in sources]
+    if workers > 1:
+        with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+            sampled = list(pool.map(_sample_source, jobs))
+    else:
+        sampled = [_sample_source(job) for job in jobs]
+    for source, _, seconds in sampled:
+        print(f"    {source:<18} {seconds:6.2f}s")
+    values = {source: v for source, v, _ in sampled}
+
+    flags = {}
+    for hazard, (source, op, threshold) in rules.items():
+        v = values[source]
+        flags[hazard] = np.where(np.isnan(v), np.nan, COMPARE[op](v, threshold).astype("float64"))
+    return pd.DataFrame(flags)[[h for h in HAZARD_COLUMNS if h in flags]]
+
+
+###########################
+# Run over the store
+
+def compare_flags(computed, reference):
+    """Share of schools where computed and reference flags agree, per hazard (missing counts as its own value)."""
+    agree = {}
+    for hazard in computed.columns:
+        a, b = computed[hazard].to_numpy(), reference[hazard].to_numpy(dtype="float64")
+        agree[hazard] = np.mean((a == b) | (np.isnan(a) & np.isnan(b)))
+    return pd.Series(agree, name="agreement")
+
+
+def run(raster_dir=RASTER_DIR, out=EXPOSURE_PARQUET, workers=1, compare=False, store=STORE_DIR):
+    timings = {}
+    with stage("schools", timings):
+        frames = [load_country(c, store=store).assign(Country=c) for c in list_countries(store)["Country"]]
+        schools = pd.concat(frames, ignore_index=True)
+    with stage("sample", timings):
+        flags = compute_exposure(schools["lon"], schools["lat"], raster_dir, workers=workers)
+    with stage("write", timings):
+        result = pd.concat([schools[["Country", "School Name", "lon", "lat"]], flags], axis=1)
+        result.to_parquet(out, index=False)
+    print(f"Wrote hazard flags for {len(result):,} schools to {out} ({sum(timings.values()):.2f}s total)")
+    if compare:
+        print(compare_flags(flags, schools).to_string(float_format="{:.2%}".format))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rasters", default=RASTER_DIR, help="directory with one <source>.tif per hazard source")
+    parser.add_argument("--out", default=EXPOSURE_PARQUET)
+    parser.add_argument("--workers", type=int, default=1, help="sample raster sources in parallel")
+    parser.add_argument("--compare", action="store_true", help="report agreement with the flags in the school store")
+    args = parser.parse_args()
+    run(args.rasters, args.out, args.workers, args.compare)
@@ -0,0 +1,288 @@
+"""Plotly figures shared by the dashboard pages, cached per data version.
+
+Building the SRI choropleth with Plotly Express takes tens of milliseconds and
+used to happen on every rerun. ``cached_figure`` keeps one figure per process
+for each (name, data version) and also stores its serialized JSON in
+``FIGURE_DIR``, so a fresh process loads the JSON instead of rebuilding. Run
+``python -m sri.figures`` before starting the server to prebuild the cache.
+"""
+
+import json
+import os
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+from plotly import subplots
+
+from sri.admin import ADMIN1_GEOJSON, ADMIN1_SRI_CSV
+from sri.data import CACHE_DIR, COUNTRIES_CSV, countries, data_version, scenario_countries, sri_cube, sri_uncertainty
+from sri.scenario import DEFAULT_WEIGHTS
+from sri.uncertainty import INTERVAL, UNCERTAINTY_CSV
+
+
+FIGURE_DIR = os.path.join(CACHE_DIR, "figures")
+
+
+# Define color categories
+SRI_colors = {
+    "Low": "#ebeff1",
+    "Low-Medium": "#F2E8CF",
+    "Medium-High": "#81B29A",
+    "High": "#4C5F70",
+    "Extremely High": "#293241"
+}
+SRI_categories = ["Low", "Low-Medium", "Medium-High", "High", "Extremely High"]
+
+# Choropleth map function
+def make_choropleth(df):
+    custom_data = ["COUNTRY", "GID", "REGION", "INCOME GROUP", "SRI", "SRI_category", "coastflood", "rivflood", "watersc", "heatwvs", "pm25", "cyclns"]
+    hover_uncertainty = ""
+    # Bootstrap intervals from sri.uncertainty, when merged into df
+    if "SRI_low" in df.columns:
+        custom_data += ["SRI_low", "SRI_high", "p_category_change"]
+        hover_uncertainty = (
+            f"<u>{INTERVAL:.0%} interval:</u> %{{customdata[12]:.2f}}–%{{customdata[13]:.2f}}<br>"
+            "<u>Chance of another category:</u> %{customdata[14]:.0%}<br>"
+        )
+    fig = px.choropleth(
+        df,
+        locations="GID",
+        color="SRI_category",
+        locationmode="ISO-3",
+        color_discrete_map=SRI_colors,
+        category_orders={'SRI_category': SRI_categories},
+        projection="robinson",
+        custom_data=custom_data
+    )
+    fig.update_layout(
+        geo=dict(showland=False, showocean=False, showcountries=False, showframe=False, bgcolor='rgba(0,0,0,0)'),
+        margin=dict(l=0, r=0, t=0, b=0),
+        height=600,
+        legend=dict(
+            title=dict(
+                text="<b>SRI Categories</b>"
+            ), 
+            orientation="h", 
+            yanchor="top", 
+            xanchor="auto")
+    )
+    fig.update_traces(
+        hovertemplate=(
+            "<b>%{customdata[0]}: %{customdata[5]}</b><br>"
+            "<u>SRI:</u> %{customdata[4]:.2f}<br>"
+            + hover_uncertainty +
+            "Water Scarcity: %{customdata[8]}<br>"
+            "Riverine Flooding: %{customdata[7]}<br>"
+            "Coastal Flooding: %{customdata[6]}<br>"
+            "Tropical Cyclones: %{customdata[11]}<br>"
+            "Air Pollution: %{customdata[10]}<br>"
+            "Heatwaves: %{customdata[9]}<br>"
+        )
+    )
+    return fig
+
+
+# Province (admin-1) map from sri.admin, styled like the country map
+def make_admin1_choropleth(df, geojson):
+    fig = px.choropleth(
+        df,
+        geojson=geojson,
+        locations="admin1_id",
+        featureidkey="properties.admin1_id",
+        color="SRI_category",
+        color_discrete_map=SRI_colors,
+        category_orders={'SRI_category': SRI_categories},
+        projection="robinson",
+        custom_data=["admin1_name", "GID", "n_schools", "SRI", "SRI_category", "coastflood", "rivflood", "watersc", "heatwvs", "pm25", "cyclns"]
+    )
+    fig.update_traces(marker_line_width=0.2)
+    fig.update_layout(
+        geo=dict(showland=True, landcolor="#f7f7f7", showocean=False, showcountries=True, countrycolor="#bbbbbb", showframe=False, bgcolor='rgba(0,0,0,0)'),
+        margin=dict(l=0, r=0, t=0, b=0),
+        height=600,
+        legend=dict(
+            title=dict(
+                text="<b>SRI Categories</b>"
+            ),
+            orientation="h",
+            yanchor="top",
+            xanchor="auto")
+    )
+    fig.update_traces(
+        hovertemplate=(
+            "<b>%{customdata[0]} (%{customdata[1]}): %{customdata[4]}</b><br>"
+            "<u>SRI:</u> %{customdata[3]:.2f} (%{customdata[2]:,} schools)<br>"
+            "Water Scarcity: %{customdata[7]}<br>"
+            "Riverine Flooding: %{customdata[6]}<br>"
+            "Coastal Flooding: %{customdata[5]}<br>"
+            "Tropical Cyclones: %{customdata[10]}<br>"
+            "Air Pollution: %{customdata[9]}<br>"
+            "Heatwaves: %{customdata[8]}<br>"
+        )
+    )
+    return fig
+
+
+def with_uncertainty(df):
+    """``df`` with the bootstrap interval columns merged in, when they have been computed."""
+    uncertainty = sri_uncertainty()
+    if uncertainty is None:
+        return df
+    return df.merge(uncertainty[["COUNTRY", "SRI_low", "SRI_high", "p_category_change"]], on="COUNTRY", how="left")
+
+
+def sri_choropleth():
+    """World map of SRI categories, rebuilt only when the country data or its intervals change."""
+    version = data_version(COUNTRIES_CSV)
+    if os.path.exists(UNCERTAINTY_CSV):
+        version += "-" + data_version(UNCERTAINTY_CSV)
+    return cached_figure("sri_choropleth", version, lambda: make_choropleth(with_uncertainty(countries())))
+
+
+@st.cache_resource(max_entries=32)
+def _scenario_choropleth(version, weights):
+    return make_choropleth(scenario_countries(weights))
+
+
+def scenario_choropleth(weights):
+    """SRI map for custom hazard ``weights``; the default weights give the published map."""
+    weights = tuple(float(w) for w in weights)
+    if weights == DEFAULT_WEIGHTS:
+        return sri_choropleth()
+    return _scenario_choropleth(data_version(COUNTRIES_CSV), weights)
+
+
+def admin1_choropleth():
+    """Province-level SRI map, or None until ``python -m sri.admin`` has been run."""
+    if not os.path.exists(ADMIN1_SRI_CSV):
+        return None
+
+    def build():
+        with open(ADMIN1_GEOJSON) as f:
+            return make_admin1_choropleth(pd.read_csv(ADMIN1_SRI_CSV), json.load(f))
+
+    return cached_figure("admin1_choropleth", data_version(ADMIN1_SRI_CSV), build)
+
+
+def make_distribution(cube):
+    """Stacked bars of SRI category shares by region and by income group."""
+    # Precomputed shares, see sri/cube.py
+    df_bar_pct = cube.shares("SRI", by="REGION").reset_index()
+
+    # --- Sort regions by combined share of "Extremely High" and "High" ---
+    df_bar_pct["high_share"] = df_bar_pct.get("High", 0) + df_bar_pct.get("Extremely High", 0)
+    region_order = df_bar_pct.sort_values("high_share")["REGION"].tolist()  # ascending: lowest left, highest right
+
+    df_melted = df_bar_pct.melt(id_vars="REGION", var_name="SRI Category", value_name="Percentage")
+
+    df_income_pct = cube.shares("SRI", by="INCOME GROUP").reset_index()
+    df_income_melted = df_income_pct.melt(id_vars="INCOME GROUP", var_name="SRI Category", value_name="Percentage")
+
+    # Create side-by-side subplot
+    fig = subplots.make_subplots(
+        rows=1, cols=2,
+        shared_yaxes=True,
+        horizontal_spacing=0.08,
+        subplot_titles=("SRI Distribution by Region", "SRI Distribution by Income Group")
+    )
+
+    # Region bars (left)
+    for category in SRI_categories:
+        trace = df_melted[df_melted["SRI Category"] == category]
+        # Ensure the order of regions
+        trace = trace.set_index("REGION").reindex(region_order).reset_index()
+        fig.add_trace(
+            go.Bar(
+                x=trace["REGION"],
+                y=trace["Percentage"],
+                name=category,
+                marker=dict(color=SRI_colors[category]),
+                legendgroup=category,
+                legendrank=SRI_categories.index(category)
+            ),
+            row=1, col=1
+        )
+
+    income_order = ["Low Income", "Lower Middle Income", "Upper Middle Income", "High Income"]
+
+    # Income bars (right)
+    for category in SRI_categories:
+        trace = df_income_melted[df_income_melted["SRI Category"] == category]
+        # Ensure the order of income groups
+        trace = trace.set_index("INCOME GROUP").reindex(income_order).reset_index()
+        fig.add_trace(
+            go.Bar(
+                x=trace["INCOME GROUP"],
+                y=trace["Percentage"],
+                name=category,
+                marker=dict(color=SRI_colors[category]),
+                legendgroup=category,
+                legendrank=SRI_categories.index(category),
+                showlegend=False  # Only show once
+            ),
+            row=1, col=2
+        )
+
+    # Final layout tweaks
+    fig.update_layout(
+        barmode="stack",
+        height=500,
+        yaxis_tickformat=".0%",
+        margin=dict(t=60, b=60),
+        xaxis_tickangle=-45,
+        xaxis2_tickangle=-45,
+        xaxis=dict(title="", showticklabels=True),
+        xaxis2=dict(title="", showticklabels=True),
+        yaxis=dict(range=[0, 1]),
+        legend=dict(
+            title='SRI Categories',
+            orientation="h",
+            yanchor="bottom",
+            y=1.12,
+            xanchor="center",
+            x=0.5
+        )
+    )
+    return fig
+
+
+def sri_distribution():
+    """SRI distribution charts, rebuilt only when the country data changes."""
+    return cached_figure("sri_distribution", data_version(COUNTRIES_CSV), lambda: make_distribution(sri_cube()))
+
+
+###########################
+# Figure cache
+
+@st.cache_resource(max_entries=16)
+def cached_figure(name, version, _build):
+    """Figure ``name`` for data ``version``, from memory, the JSON cache, or ``_build()``.
+
+    The returned figure is shared across sessions: do not modify it.
+    """
+    path = os.path.join(FIGURE_DIR, f"{name}-{version}.json")
+    if os.path.exists(path):
+        with open(path) as f:
+            return pio.from_json(f.read())
+
+    fig = _build()
+    os.makedirs(FIGURE_DIR, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        f.write(pio.to_json(fig, validate=False))
+    os.replace(path + ".tmp", path)
+    return fig
+
+
+def warm_up():
+    """Prebuild every cached figure."""
+    sri_choropleth()
+    sri_distribution()
+    admin1_choropleth()
+
+
+if __name__ == "__main__":
+    warm_up()
+    print(f"Figure cache warmed in {FIGURE_DIR}")
@@ -0,0 +1,124 @@
+"""Per-interaction server time of the dashboard tabs, full reruns vs fragment reruns.
+
+Each interactive tab runs in an ``st.fragment``, so a widget change reruns only
+that tab instead of the whole page. This drives the pages headlessly with
+Streamlit's ``AppTest`` and times the script run after each widget change, once
+as a full rerun (what every interaction cost before fragments) and once scoped
+to the tab's fragment, as the browser does. ``AppTest`` always requests full
+reruns, so for the fragment runs its script runner is patched to request the
+fragment instead. Times are medians over ``--repeat`` changes per value::
+
+    python -m sri.fragmentbench [--repeat 10]
+"""
+
+import argparse
+import re
+import statistics
+import time
+
+from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData, ScriptRequestType
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+
+P2 = "pages/02_Introducing the School Risk Index.py"
+P3 = "pages/03_Deep Dive - School Data.py"
+P4 = "pages/04_Deep Dive - Hazard Data.py"
+
+# label -> (page, tab index, widget getter, values to alternate between, or None for the first two options)
+INTERACTIONS = {
+    "02 Contextual Data: sort radio": (P2, 2, lambda at: [r for r in at.radio if r.label == "Sort by:"][0], ["Sort SRI ↑", "Sort SRI ↓"]),
+    "02 Map: hazard weight slider": (P2, 0, lambda at: at.slider(key="weight_heatwvs"), [0.5, 1.5]),
+    "03 Country Explorer: country select": (P3, 1, lambda at: at.selectbox[0], None),
+    "03 Data Validation: countries shown": (P3, 2, lambda at: [r for r in at.radio if r.label == "Countries shown"][0], None),
+    "04 Hazard Maps: layer radio": (P4, 1, lambda at: at.radio[0], None),
+}
+
+
+###########################
+# Fragment-scoped runs in AppTest
+
+_scope = {"fragment": None}  # fragment id the next rerun is scoped to
+_script_times = []           # seconds of each script (or fragment) run
+_request_rerun = LocalScriptRunner.request_rerun
+_init = LocalScriptRunner.__init__
+
+
+def _scoped_request_rerun(self, rerun_data):
+    if _scope["fragment"]:
+        rerun_data = RerunData(widget_states=rerun_data.widget_states, query_string=rerun_data.query_string,
+                               page_script_hash=rerun_data.page_script_hash, fragment_id_queue=[_scope["fragment"]])
+    return _request_rerun(self, rerun_data)
+
+
+def _timed_init(self, *args, **kwargs):
+    _init(self, *args, **kwargs)
+    if _scope["fragment"]:
+        # Drop the full rerun queued by the constructor so the fragment request runs alone
+        self._requests._state = ScriptRequestType.CONTINUE
+        self._requests._rerun_data = RerunData()
+    started = {}
+
+    def on_event(sender, event, **kwargs):
+        if event == ScriptRunnerEvent.SCRIPT_STARTED:
+            started["t"] = time.perf_counter()
+        elif event in (ScriptRunnerEvent.SCRIPT_STOPPED_WITH_SUCCESS, ScriptRunnerEvent.FRAGMENT_STOPPED_WITH_SUCCESS):
+            if "t" in started:
+                _script_times.append(time.perf_counter() - started.pop("t"))
+
+    self.on_event.connect(on_event, weak=False)
+
+
+LocalScriptRunner.request_rerun = _scoped_request_rerun
+LocalScriptRunner.__init__ = _timed_init
+
+
+###########################
+# Benchmark
+
+def open_tab(page, tab):
+    """The page run with its tab number ``tab`` open."""
+    with open(page, encoding="utf-8") as f:
+        src = f.read()
+    names = [n.strip().strip('"') for n in re.search(r"st\.tabs\(\[(.*?)\]", src, re.S).group(1).split(",")]
+    src = src.replace('on_change="rerun")', f'on_change="rerun", default={names[tab]!r})', 1)
+    at = AppTest.from_string(src, default_timeout=120)
+    at.secrets["MAPBOX_API_KEY"] = "benchmark"
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"{page}: {at.exception[0].value}")
+    return at
+
+
+def measure(page, tab, widget, values, repeat, scoped):
+    """Median script time in seconds after changing ``widget`` ``repeat`` times per value."""
+    at = open_tab(page, tab)
+    values = values or list(widget(at).options[:2])
+    fragments = list(at._fragment_storage._fragments)
+    del _script_times[:]
+    for i in range(repeat * len(values)):
+        widget(at).set_value(values[i % len(values)])
+        _scope["fragment"] = fragments[0] if scoped and fragments else None
+        try:
+            at.run()
+        finally:
+            _scope["fragment"] = None
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception[0].value}")
+    return statistics.median(_script_times)
+
+
+def run(repeat=10):
+    print(f"{'interaction':<40} {'full rerun':>11} {'fragment':>9}")
+    for label, (page, tab, widget, values) in INTERACTIONS.items():
+        full = measure(page, tab, widget, values, repeat, scoped=False)
+        fragment = measure(page, tab, widget, values, repeat, scoped=True)
+        print(f"{label:<40} {full * 1000:9.0f}ms {fragment * 1000:7.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="changes per widget value")
+    args = parser.parse_args()
+    run(args.repeat)
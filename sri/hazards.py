@@ -0,0 +1,44 @@
+"""Vectorized encoding of the eight school hazard flags.
+
+Each school's 0/1 hazard flags are packed into a single uint8 bitmask (bit ``i``
+is ``HAZARD_COLUMNS[i]``). All 256 possible masks are labelled once up front, so
+turning a column of masks into tooltip text is a single array lookup.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+HAZARD_COLUMNS = ["Water Scarcity", "Coastal Flooding", "Riverine Flooding", "Heatwaves", "Cyclones Cat 1&2", "Cyclones Cat 3+", "PM2.5 above 9μg/m³", "PM2.5 above 35μg/m³"]
+
+HAZARD_BITS = (1 << np.arange(len(HAZARD_COLUMNS))).astype(np.uint8)
+
+# Label for every possible bitmask, e.g. HAZARD_LABELS[0b101] == "Water Scarcity, Riverine Flooding"
+HAZARD_LABELS = np.array(
+    [", ".join(h for h, bit in zip(HAZARD_COLUMNS, HAZARD_BITS) if mask & bit) or "None" for mask in range(256)],
+    dtype=object,
+)
+
+
+def encode_hazards(df):
+    """Pack the hazard columns of ``df`` into a uint8 bitmask. Missing values count as not exposed."""
+    flags = df[HAZARD_COLUMNS].to_numpy(dtype="float32", na_value=0) == 1
+    return (flags.astype(np.uint8) * HAZARD_BITS).sum(axis=1, dtype=np.uint8)
+
+
+def hazard_labels(mask):
+    """Comma-separated hazard names for each bitmask."""
+    return HAZARD_LABELS[np.asarray(mask, dtype=np.uint8)]
+
+
+def hazard_counts(mask):
+    """Number of schools exposed to each hazard, indexed by hazard name."""
+    mask = np.asarray(mask, dtype=np.uint8)
+    return pd.Series([np.count_nonzero(mask & bit) for bit in HAZARD_BITS], index=HAZARD_COLUMNS)
+
+
+def add_hazard_columns(df):
+    """Add the ``hazard_mask`` and ``Hazards`` label columns to a frame of schools."""
+    df["hazard_mask"] = encode_hazards(df)
+    df["Hazards"] = hazard_labels(df["hazard_mask"])
+    return df
@@ -0,0 +1,169 @@
+"""Average annual heatwave count per grid cell from gridded daily temperature.
+
+A heatwave is a run of at least ``MIN_DAYS`` consecutive days above the
+threshold in a cell. The input is streamed in time-by-row chunks. For each
+chunk, the run length of every cell on every day is computed in one vectorized
+pass with a cumulative-sum reset trick. Each run is counted on the day it
+reaches ``MIN_DAYS``, so it counts once however long it lasts and wherever the
+chunk boundaries fall. The state between chunks is one run length and one
+event count per cell, so memory is bounded by the chunk size, not by the
+number of years.
+
+Inputs are NetCDF or Zarr (read lazily through xarray, e.g. Berkeley Earth
+daily gridded anomalies) or, as a local stand-in, a ``(time, lat, lon)`` ``.npy``
+array with a ``<file>.json`` sidecar giving ``start`` (first date) and ``bounds``
+(west, south, east, north, rows north to south). The job writes:
+
+- ``data/hazards/heatwaves.tif``, the count raster sampled by ``sri.exposure``
+- ``images/heatwaves.png``, the map image, with its bounds in ``images/heatwaves.png.json``
+- the Heatwaves tile pyramid for the Hazard Data page (see ``sri.pyramid``)
+
+::
+
+    python -m sri.heatwaves berkeley_earth_tmax_daily.nc --variable temperature --threshold 5
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from sri.exposure import HAZARD_RULES, RASTER_DIR, raster_path
+from sri.pyramid import PYRAMIDS, STATIC_TILE_DIR, build_pyramid
+
+
+MIN_DAYS = 3
+THRESHOLD = 5.0          # °C above the daily climatology for Berkeley Earth anomalies
+TIME_CHUNK = 366         # days per chunk
+ROW_CHUNK = 90           # grid rows per chunk
+
+HEATWAVE_THRESHOLD = HAZARD_RULES["Heatwaves"][2]  # average annual heatwaves counted as exposed
+EXPOSED_COLOR = (255, 43, 24, 255)
+NOT_EXPOSED_COLOR = (204, 204, 204, 255)
+
+
+###########################
+# Input
+
+def open_temperature(path, variable="temperature"):
+    """``(values, dates, bounds, north_up)`` of a daily grid without loading it.
+
+    ``values`` can be sliced as ``[time, row, col]``. ``north_up`` tells whether
+    row 0 is the northern edge.
+    """
+    if path.endswith(".npy"):
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        values = np.load(path, mmap_mode="r")
+        dates = pd.date_range(meta["start"], periods=values.shape[0], freq="D")
+        return values, dates, tuple(meta["bounds"]), True
+
+    import xarray as xr
+
+    ds = xr.open_zarr(path) if path.endswith(".zarr") else xr.open_dataset(path)
+    da = ds[variable]
+    lat_name, lon_name = da.dims[1], da.dims[2]
+    lat, lon = ds[lat_name].values, ds[lon_name].values
+    dlat, dlon = abs(lat[1] - lat[0]), abs(lon[1] - lon[0])
+    bounds = (lon.min() - dlon / 2, lat.min() - dlat / 2, lon.max() + dlon / 2, lat.max() + dlat / 2)
+    return da, pd.DatetimeIndex(ds[da.dims[0]].values), bounds, bool(lat[0] > lat[-1])
+
+
+###########################
+# Run-length counting
+
+def run_lengths(hot, carry):
+    """Run length of hot days at every step of ``hot`` (time first), continuing runs of length ``carry``."""
+    count = carry + np.cumsum(hot, axis=0, dtype=np.int32)
+    # Each cool day resets the run: subtract the running count as of the latest cool day
+    last_reset = np.maximum.accumulate(np.where(hot, 0, count), axis=0)
+    return count - last_reset
+
+
+def count_heatwaves(values, dates, threshold=THRESHOLD, min_days=MIN_DAYS, time_chunk=TIME_CHUNK, row_chunk=ROW_CHUNK):
+    """Average heatwaves per year for every cell, NaN where there is no data at all."""
+    n_time, n_rows, n_cols = values.shape
+    run = np.zeros((n_rows, n_cols), dtype=np.int32)
+    events = np.zeros((n_rows, n_cols), dtype=np.int32)
+    valid = np.zeros((n_rows, n_cols), dtype=bool)
+    threshold = np.asarray(threshold, dtype="float32")
+
+    for t0 in range(0, n_time, time_chunk):
+        for r0 in range(0, n_rows, row_chunk):
+            rows = slice(r0, min(r0 + row_chunk, n_rows))
+            block = np.asarray(values[t0:t0 + time_chunk, rows, :], dtype="float32")
+            cell_threshold = threshold[rows] if threshold.ndim == 2 else threshold
+            # Missing days (NaN) are not hot and end a run
+            hot = block > cell_threshold
+            lengths = run_lengths(hot, run[rows])
+            events[rows] += (lengths == min_days).sum(axis=0, dtype=np.int32)
+            run[rows] = lengths[-1]
+            valid[rows] |= ~np.isnan(block).all(axis=0)
+
+    n_years = len(np.unique(pd.DatetimeIndex(dates).year))
+    return np.where(valid, events / n_years, np.nan).astype("float32")
+
+
+###########################
+# Output
+
+def write_raster(counts, bounds, path):
+    """Float32 GeoTIFF of the counts in EPSG:4326 (rows north to south)."""
+    import rasterio
+    from rasterio.transform import from_bounds
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    profile = dict(driver="GTiff", height=counts.shape[0], width=counts.shape[1], count=1, dtype="float32",
+                   crs="EPSG:4326", transform=from_bounds(*bounds, counts.shape[1], counts.shape[0]),
+                   nodata=np.nan, tiled=True, blockxsize=256, blockysize=256, compress="deflate")
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(counts, 1)
+
+
+def render_map(counts, bounds, path, threshold=HEATWAVE_THRESHOLD):
+    """Map image in the style of the published heatwaves image: exposed cells red, others grey, no data transparent.
+
+    The bounds go to a ``<path>.json`` sidecar, which ``sri.pyramid`` reads when cutting tiles.
+    """
+    rgba = np.zeros(counts.shape + (4,), dtype=np.uint8)
+    rgba[counts >= threshold] = EXPOSED_COLOR
+    rgba[counts < threshold] = NOT_EXPOSED_COLOR
+    Image.fromarray(rgba).save(path, optimize=True)
+    with open(path + ".json", "w") as f:
+        json.dump({"bounds": [float(b) for b in bounds]}, f)
+
+
+def run(src, variable="temperature", threshold=THRESHOLD, min_days=MIN_DAYS, raster_dir=RASTER_DIR, tiles=True):
+    start = time.perf_counter()
+    values, dates, bounds, north_up = open_temperature(src, variable)
+    counts = count_heatwaves(values, dates, threshold, min_days)
+    if not north_up:
+        counts = counts[::-1]
+    print(f"Counted heatwaves over {len(dates):,} days on a {counts.shape[0]}x{counts.shape[1]} grid ({time.perf_counter() - start:.1f}s)")
+
+    out = raster_path("heatwaves", raster_dir)
+    write_raster(counts, bounds, out)
+    image, slug, max_zoom = PYRAMIDS["Heatwaves"]
+    render_map(counts, bounds, image)
+    print(f"Wrote {out} and {image}")
+    if tiles:
+        dest = os.path.join(STATIC_TILE_DIR, slug)
+        n_tiles, n_bytes = build_pyramid(image, dest, max_zoom)
+        print(f"Wrote {n_tiles} tiles ({n_bytes / 1024:.0f} KB) to {dest}")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("src", help="daily temperature grid (.nc, .zarr, or .npy with a .json sidecar)")
+    parser.add_argument("--variable", default="temperature")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--min-days", type=int, default=MIN_DAYS)
+    parser.add_argument("--rasters", default=RASTER_DIR)
+    parser.add_argument("--no-tiles", dest="tiles", action="store_false", help="skip rebuilding the map tile pyramid")
+    args = parser.parse_args()
+    run(args.src, args.variable, args.threshold, args.min_days, args.rasters, args.tiles)
@@ -0,0 +1,71 @@
+"""Import-time benchmark of the dashboard pages.
+
+Runs the top-level imports of every page (including ``lazy_import`` calls,
+which cost next to nothing until used) in a fresh interpreter with
+``-X importtime`` and reports the wall time and the most expensive modules.
+The "all tabs" column is the cost once every lazily imported module has been
+loaded too, i.e. what a page paid before imports were deferred::
+
+    python -m sri.importbench [--repeat N]
+"""
+
+import argparse
+import ast
+import glob
+import statistics
+import subprocess
+import sys
+
+
+PAGES = ["01_Home.py"] + sorted(glob.glob("pages/*.py"))
+
+
+def page_imports(path):
+    """Source of the module-level imports and ``lazy_import`` assignments of a page, and the lazily imported names."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    stmts, deferred = [], []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            stmts.append(node)
+        elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Call) and getattr(node.value.func, "id", None) == "lazy_import":
+            stmts.append(node)
+            deferred.append(node.value.args[0].value)
+    return "\n".join(ast.unparse(s) for s in stmts), deferred
+
+
+def measure(code):
+    """Wall time in seconds and per-module cumulative import times (µs) of ``code`` in a fresh interpreter."""
+    timed = f"import time\n_t = time.perf_counter()\n{code}\nprint(time.perf_counter() - _t)"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", timed], capture_output=True, text=True, check=True)
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                # Only top-level entries: nested imports are indented in the report
+                if not name.startswith("  "):
+                    modules[name.strip()] = int(cumulative)
+    return float(proc.stdout.strip().splitlines()[-1]), modules
+
+
+def run(repeat=3, top=3):
+    startup = measure("pass")[1]  # interpreter startup (site, encodings, ...) isn't the page's cost
+    print(f"{'page':<48} {'startup':>9} {'all tabs':>9}  slowest imports at startup")
+    for page in PAGES:
+        code, deferred = page_imports(page)
+        eager = "\n".join([code] + [f"import {name}" for name in deferred])
+        results = [measure(code) for _ in range(repeat)]
+        median = statistics.median(r[0] for r in results)
+        median_all = statistics.median(measure(eager)[0] for _ in range(repeat))
+        modules = {name: us for name, us in results[-1][1].items() if name not in startup}
+        slowest = sorted(modules.items(), key=lambda kv: -kv[1])[:top]
+        detail = ", ".join(f"{name} {us / 1000:.0f}ms" for name, us in slowest)
+        print(f"{page:<48} {median * 1000:7.0f}ms {median_all * 1000:7.0f}ms  {detail}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.repeat)
@@ -0,0 +1,60 @@
+"""Deferred imports for the dashboard pages.
+
+``lazy_import`` returns a module whose code only runs on first attribute access,
+so a page can keep ``pdk = lazy_import("pydeck")`` at the top and only pay for
+pydeck when the tab that draws the map actually renders. ``warm_up_modules``
+imports modules on a background thread, e.g. from the Home page, so they are
+usually loaded by the time a user navigates to a page that needs them.
+"""
+
+import importlib
+import sys
+import threading
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access.
+
+    Unlike ``importlib.util.LazyLoader`` nothing is put in ``sys.modules`` until
+    the real import happens, so Streamlit's file watcher (which reads
+    ``__file__`` of every loaded module) doesn't trigger the import early.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """Module ``name``, imported on first attribute access instead of now."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+_warmed = set()
+_warm_lock = threading.Lock()
+
+
+def warm_up_modules(names):
+    """Import ``names`` on a daemon thread, once per process."""
+    with _warm_lock:
+        pending = [n for n in names if n not in _warmed]
+        _warmed.update(pending)
+    if pending:
+        threading.Thread(target=_import_all, args=(pending,), name="sri-warm-up", daemon=True).start()
+
+
+def _import_all(names):
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
@@ -0,0 +1,68 @@
+"""Level-of-detail helpers for the school maps.
+
+Countries with more schools than ``POINT_BUDGET`` are not sent to the browser
+point by point. Instead the schools are binned server-side into a square grid
+of roughly ``n_cells`` cells across the country, with per-hazard counts for each
+cell, and only those cells are drawn.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from sri.hazards import HAZARD_BITS, HAZARD_COLUMNS
+
+
+# Most schools drawn as individual points; override with the SRI_POINT_BUDGET environment variable
+POINT_BUDGET = int(os.environ.get("SRI_POINT_BUDGET", 20_000))
+
+# Columns the point tooltip needs besides the position, everything else stays on the server
+POINT_COLUMNS = ["School Name", "Hazards"]
+
+# Short record keys for the per-hazard counts of a grid cell, to keep the cell payload small
+CELL_HAZARD_KEYS = {hazard: f"h{i}" for i, hazard in enumerate(HAZARD_COLUMNS)}
+
+METERS_PER_DEGREE = 111_320
+
+
+def grid_aggregate(lon, lat, mask, n_cells=60):
+    """Bin schools into a square grid and count schools and hazard exposure per cell.
+
+    Cells are square in meters around the mean latitude, so they line up with a
+    deck.gl ``GridCellLayer`` using ``cell_size`` from the returned frame's
+    ``attrs``. ``lon``/``lat`` of each row is the cell's south-west corner.
+    """
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.asarray(lat, dtype="float64")
+    mask = np.asarray(mask, dtype=np.uint8)
+
+    lon_min, lat_min = lon.min(), lat.min()
+    deg_lon = METERS_PER_DEGREE * np.cos(np.radians(lat.mean()))
+    extent_m = max((lon.max() - lon_min) * deg_lon, (lat.max() - lat_min) * METERS_PER_DEGREE)
+    cell_m = max(extent_m / n_cells, 100.0)
+    dlon, dlat = cell_m / deg_lon, cell_m / METERS_PER_DEGREE
+
+    ix = ((lon - lon_min) // dlon).astype(np.int64)
+    iy = ((lat - lat_min) // dlat).astype(np.int64)
+    cells, inverse = np.unique(ix * (iy.max() + 1) + iy, return_inverse=True)
+
+    agg = pd.DataFrame({
+        "lon": lon_min + (cells // (iy.max() + 1)) * dlon,
+        "lat": lat_min + (cells % (iy.max() + 1)) * dlat,
+        "n_schools": np.bincount(inverse),
+        "n_exposed": np.bincount(inverse, weights=mask > 0).astype(np.int64),
+    })
+    for hazard, bit in zip(HAZARD_COLUMNS, HAZARD_BITS):
+        agg[hazard] = np.bincount(inverse, weights=(mask & bit) > 0, minlength=len(cells)).astype(np.int64)
+    agg["share_exposed"] = agg["n_exposed"] / agg["n_schools"]
+    agg.attrs["cell_size"] = float(cell_m)
+    return agg
+
+
+def exposure_colors(share, low=(242, 232, 207), high=(41, 50, 65), alpha=200):
+    """RGBA color per cell, interpolated from ``low`` to ``high`` by exposed share."""
+    share = np.clip(np.asarray(share, dtype="float64"), 0, 1)[:, None]
+    rgb = np.asarray(low) + (np.asarray(high) - np.asarray(low)) * share
+    rgba = np.column_stack([rgb.round().astype(int), np.full(len(rgb), alpha)])
+    return rgba.tolist()
@@ -0,0 +1,257 @@
+"""Recompute the country-level School Risk Index from the school exposure data.
+
+The pipeline has two stages:
+
+1. ``aggregate_exposure`` streams the school parquet in record batches (or, with
+   ``workers > 1``, reads the per-country store partitions in a process pool) and
+   counts schools, exposed schools and missing values per country and hazard.
+   The counts are persisted to ``COUNTS_CSV`` together with each partition's
+   checksum from the store manifest, so ``update_counts`` can later recount only
+   the countries whose partitions changed.
+2. ``score`` turns those counts into the 0-10 hazard sub-indices and SRI,
+   following the INFORM-style procedure from the methodology: absolute exposure
+   is log-transformed, absolute and relative exposure are min-max scaled across
+   countries and averaged, two-threshold hazards are combined (PM2.5 by
+   arithmetic, cyclones by geometric mean), and the six sub-indices are
+   aggregated as ``10 - geomean(10 - x)``.
+
+Run with::
+
+    python -m sri.pipeline [--workers N] [--out PATH] [--incremental]
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from sri.hazards import HAZARD_COLUMNS
+from sri.store import SCHOOLS_PARQUET, STORE_DIR, list_countries, load_country
+
+
+COUNTRIES_CSV = "countries_SRI_simplified_inclWBdata.csv"
+OUTPUT_CSV = "data/countries_SRI_recomputed.csv"
+COUNTS_CSV = "data/exposure_counts.csv"
+
+META_COLUMNS = ["COUNTRY", "SOVEREIGN", "GID", "CONTINENT", "REGION", "INCOME GROUP"]
+SUBINDEX_COLUMNS = ["coastflood", "rivflood", "watersc", "heatwvs", "pm25", "cyclns"]
+
+# Sub-index -> school hazard columns and how multiple thresholds are combined
+SUBINDICES = {
+    "coastflood": (["Coastal Flooding"], "mean"),
+    "rivflood": (["Riverine Flooding"], "mean"),
+    "watersc": (["Water Scarcity"], "mean"),
+    "heatwvs": (["Heatwaves"], "mean"),
+    "pm25": (["PM2.5 above 9μg/m³", "PM2.5 above 35μg/m³"], "mean"),
+    "cyclns": (["Cyclones Cat 1&2", "Cyclones Cat 3+"], "geomean"),
+}
+
+SRI_BINS = [-np.inf, 2.0, 3.7, 5.4, 7.0, np.inf]
+SRI_CATEGORIES = ["Low", "Low-Medium", "Medium-High", "High", "Extremely High"]
+
+BATCH_SIZE = 200_000
+
+
+def missing_column(hazard):
+    return f"{hazard} (missing)"
+
+
+def share_column(hazard):
+    return f"{hazard} (share)"
+
+
+COUNT_COLUMNS = ["n_schools"] + HAZARD_COLUMNS + [missing_column(h) for h in HAZARD_COLUMNS]
+
+
+@contextmanager
+def stage(name, timings):
+    """Time a pipeline stage and report it."""
+    start = time.perf_counter()
+    yield
+    timings[name] = time.perf_counter() - start
+    print(f"  {name:<12} {timings[name]:7.2f}s")
+
+
+###########################
+# Stage 1: per-country exposure counts
+
+def count_exposure(df, by="Country"):
+    """Schools, exposed schools and missing values per hazard, grouped by ``by``."""
+    flags = df[HAZARD_COLUMNS]
+    keys = df[by]
+    counts = pd.concat(
+        [
+            keys.groupby(keys, observed=True).size().rename("n_schools"),
+            flags.eq(1).groupby(keys, observed=True).sum(),
+            flags.isna().groupby(keys, observed=True).sum().rename(columns=missing_column),
+        ],
+        axis=1,
+    )
+    counts.index.name = "Country"
+    return counts[COUNT_COLUMNS].astype("int64")
+
+
+def _count_country(country):
+    df = load_country(country, columns=HAZARD_COLUMNS)
+    df["Country"] = country
+    return count_exposure(df)
+
+
+def count_countries(countries, workers=1):
+    """Exposure counts for the given store partitions, optionally across ``workers`` processes."""
+    if len(countries) == 0:
+        return pd.DataFrame(columns=COUNT_COLUMNS, dtype="int64").rename_axis("Country")
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            parts = list(pool.map(_count_country, countries, chunksize=4))
+    else:
+        parts = [_count_country(c) for c in countries]
+    return pd.concat(parts).sort_index()
+
+
+def aggregate_exposure(src=SCHOOLS_PARQUET, workers=1):
+    """Per-country exposure counts, streamed from ``src`` or split by country across ``workers`` processes."""
+    if workers > 1:
+        return count_countries(list_countries(STORE_DIR)["Country"].tolist(), workers)
+
+    # Stream in record batches: memory is bounded by BATCH_SIZE plus one row per country
+    counts = None
+    for batch in pq.ParquetFile(src).iter_batches(BATCH_SIZE, columns=["Country"] + HAZARD_COLUMNS):
+        part = count_exposure(batch.to_pandas())
+        counts = part if counts is None else counts.add(part, fill_value=0)
+    return counts.astype("int64").sort_index()
+
+
+def save_counts(counts, checksums, path=COUNTS_CSV):
+    """Persist counts, shares and partition checksums as the intermediate for incremental runs."""
+    out = counts.copy()
+    for h in HAZARD_COLUMNS:
+        valid = out["n_schools"] - out[missing_column(h)]
+        out[share_column(h)] = (out[h] / valid.where(valid > 0)).round(6)
+    out["checksum"] = checksums.reindex(out.index)
+    out.to_csv(path)
+
+
+def load_counts(path=COUNTS_CSV):
+    """Persisted counts and checksums, or an empty frame before the first run."""
+    try:
+        saved = pd.read_csv(path, index_col="Country", dtype={"checksum": str})
+    except FileNotFoundError:
+        return pd.DataFrame(columns=COUNT_COLUMNS, dtype="int64").rename_axis("Country"), pd.Series(dtype=str)
+    return saved[COUNT_COLUMNS].astype("int64"), saved["checksum"]
+
+
+def update_counts(path=COUNTS_CSV, store=STORE_DIR, workers=1):
+    """Recount only the store partitions whose checksum changed since the last run.
+
+    Countries removed from the store are dropped. Because counts are exact
+    integers, the result is identical to recounting every partition.
+    """
+    manifest = list_countries(store).set_index("Country")
+    counts, checksums = load_counts(path)
+    stale = manifest.index[manifest["checksum"].ne(checksums.reindex(manifest.index))]
+    kept = counts.loc[counts.index.intersection(manifest.index.difference(stale))]
+    counts = pd.concat([kept, count_countries(stale.tolist(), workers)]).sort_index()
+    save_counts(counts, manifest["checksum"], path)
+    return counts, stale.tolist()
+
+
+###########################
+# Stage 2: scoring
+
+def minmax(values, axis=0):
+    """Scale to 0-10 across countries (along ``axis``)."""
+    lo, hi = np.nanmin(values, axis=axis, keepdims=True), np.nanmax(values, axis=axis, keepdims=True)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    return 10 * (values - lo) / span
+
+
+def hazard_indicators(counts):
+    """0-10 exposure indicator per school hazard column, from absolute and relative exposure."""
+    exposed = counts[HAZARD_COLUMNS].to_numpy(dtype="float64")
+    valid = counts[["n_schools"]].to_numpy(dtype="float64") - counts[[missing_column(h) for h in HAZARD_COLUMNS]].to_numpy(dtype="float64")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = np.where(valid > 0, exposed / valid, np.nan)
+    indicators = (minmax(np.log1p(exposed)) + minmax(share)) / 2
+    return pd.DataFrame(indicators, index=counts.index, columns=HAZARD_COLUMNS)
+
+
+def combine_subindices(indicators):
+    """The six hazard sub-indices from the per-column indicators."""
+    sub = {}
+    for name, (columns, how) in SUBINDICES.items():
+        values = indicators[columns].to_numpy()
+        if how == "geomean":
+            with np.errstate(divide="ignore"):
+                sub[name] = np.exp(np.log(values).mean(axis=1))
+        else:
+            sub[name] = values.mean(axis=1)
+    return pd.DataFrame(sub, index=indicators.index)
+
+
+def aggregate_sri(subindices, weights=None):
+    """INFORM-style composite: ``10 - geomean(10 - x)``, ignoring missing sub-indices."""
+    values = np.asarray(subindices, dtype="float64")
+    weights = np.ones(values.shape[-1]) if weights is None else np.asarray(weights, dtype="float64")
+    w = np.where(np.isnan(values), 0.0, weights)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_gap = np.log(np.clip(10 - np.nan_to_num(values), 0, 10))
+        # A dropped (zero-weight) hazard must not contribute even where its gap is log(0)
+        return 10 - np.exp(np.where(w > 0, w * log_gap, 0.0).sum(axis=-1) / w.sum(axis=-1))
+
+
+def categorize(sri):
+    """SRI_category label and SRI_ncategory (1-5) for each SRI value, both missing where the SRI is."""
+    sri = np.asarray(sri, dtype="float64")
+    missing = np.isnan(sri)  # no sub-index available, np.digitize would put it in the top category
+    ncat = np.digitize(sri, SRI_BINS[1:-1], right=True) + 1
+    category = pd.Categorical.from_codes(np.where(missing, -1, ncat - 1), SRI_CATEGORIES)
+    return category, pd.array(np.where(missing, None, ncat), dtype="Int64")
+
+
+def score(counts, meta):
+    """Country SRI table in the layout of ``countries_SRI_simplified_inclWBdata.csv``."""
+    counts = counts[counts.index.isin(meta["COUNTRY"])]
+    sub = combine_subindices(hazard_indicators(counts))
+    out = sub.round(2)
+    out["SRI"] = aggregate_sri(sub).round(2)
+    out["SRI_category"], out["SRI_ncategory"] = categorize(out["SRI"])
+    out = meta[META_COLUMNS].merge(out, left_on="COUNTRY", right_index=True)
+    return out[META_COLUMNS + ["SRI", "SRI_ncategory", "SRI_category"] + SUBINDEX_COLUMNS].reset_index(drop=True)
+
+
+def run(src=SCHOOLS_PARQUET, out=OUTPUT_CSV, workers=1, incremental=False):
+    timings = {}
+    with stage("metadata", timings):
+        meta = pd.read_csv(COUNTRIES_CSV, usecols=META_COLUMNS)
+    with stage("aggregate", timings):
+        if incremental:
+            counts, changed = update_counts(workers=workers)
+            print(f"  recounted {len(changed)} changed partitions")
+        else:
+            counts = aggregate_exposure(src, workers=workers)
+            try:
+                checksums = list_countries(STORE_DIR).set_index("Country")["checksum"]
+            except FileNotFoundError:
+                checksums = pd.Series(dtype=str)
+            save_counts(counts, checksums)
+    with stage("score", timings):
+        result = score(counts, meta)
+    with stage("write", timings):
+        result.to_csv(out, index=False, float_format="%.2f")
+    print(f"Wrote SRI for {len(result)} countries to {out} ({sum(timings.values()):.2f}s total)")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--src", default=SCHOOLS_PARQUET)
+    parser.add_argument("--out", default=OUTPUT_CSV)
+    parser.add_argument("--workers", type=int, default=1, help="split by country across processes (needs the store from sri.store)")
+    parser.add_argument("--incremental", action="store_true", help=f"only recount store partitions that changed since {COUNTS_CSV} was written")
+    args = parser.parse_args()
+    run(args.src, args.out, args.workers, args.incremental)
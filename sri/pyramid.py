@@ -0,0 +1,132 @@
+"""Cut a hazard map image into a web-mercator ``{z}/{y}/{x}`` tile pyramid.
+
+Hazard rasters that aren't published as a tile service (so far only the
+Heatwaves layer) are exported as one large plate carrée (lon/lat) image. This
+build step reprojects it into 256 px web-mercator tiles for zoom levels
+``0..max_zoom`` by nearest-neighbour sampling, which keeps the few flat legend
+colors intact, and writes each non-empty tile as a palette PNG. The tiles are
+served by Streamlit's static file serving, so the layer goes through the same
+folium tile path as the other hazards::
+
+    python -m sri.pyramid [images/heatwaves.png] [--layer heatwaves] [--max-zoom 5]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+from PIL import Image
+
+
+TILE_SIZE = 256
+STATIC_TILE_DIR = "static/tiles"
+STATIC_TILE_URL = "/app/static/tiles"  # where Streamlit serves ./static when server.enableStaticServing is on
+
+PYRAMIDS = {
+    # layer name on the Hazard Data page -> (source image, slug, highest zoom level built)
+    "Heatwaves": ("images/heatwaves.png", "heatwaves", 5),
+}
+
+Image.MAX_IMAGE_PIXELS = None  # the source exports are large but trusted
+
+
+def load_source(path, bounds=None):
+    """RGBA array and its (west, south, east, north) bounds.
+
+    Explicit ``bounds``, or those in a ``<path>.json`` sidecar, describe the whole
+    image. Without them the image is cropped to its non-transparent content, which
+    is assumed to span 180°W-180°E with its bottom edge at 90°S; the top edge
+    follows from the pixel aspect ratio.
+    """
+    img = np.asarray(Image.open(path).convert("RGBA"))
+    if bounds is None and os.path.exists(path + ".json"):
+        with open(path + ".json") as f:
+            bounds = tuple(json.load(f)["bounds"])
+    if bounds is None:
+        content = img[..., 3] > 0
+        rows = np.flatnonzero(content.any(axis=1))
+        cols = np.flatnonzero(content.any(axis=0))
+        img = img[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+        deg_per_px = 360 / img.shape[1]
+        bounds = (-180.0, -90.0, 180.0, -90.0 + img.shape[0] * deg_per_px)
+    return img, bounds
+
+
+def tile_lonlat(z, x, y):
+    """Longitude of each pixel column and latitude of each pixel row of tile ``z/x/y``."""
+    n = TILE_SIZE * 2 ** z
+    px = (x * TILE_SIZE + np.arange(TILE_SIZE) + 0.5) / n
+    py = (y * TILE_SIZE + np.arange(TILE_SIZE) + 0.5) / n
+    lon = px * 360 - 180
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * py))))
+    return lon, lat
+
+
+def render_tile(img, bounds, z, x, y):
+    """RGBA pixels of one tile, or ``None`` if it has no content."""
+    west, south, east, north = bounds
+    lon, lat = tile_lonlat(z, x, y)
+    col = np.floor((lon - west) / (east - west) * img.shape[1]).astype(np.int64)
+    row = np.floor((north - lat) / (north - south) * img.shape[0]).astype(np.int64)
+    col_ok = (col >= 0) & (col < img.shape[1])
+    row_ok = (row >= 0) & (row < img.shape[0])
+    if not col_ok.any() or not row_ok.any():
+        return None
+
+    tile = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    tile[np.ix_(row_ok, col_ok)] = img[np.ix_(row[row_ok], col[col_ok])]
+    return tile if tile[..., 3].any() else None
+
+
+def build_pyramid(src, dest, max_zoom=5, bounds=None, colors=16):
+    """Write ``dest/{z}/{y}/{x}.png`` for every non-empty tile up to ``max_zoom``; returns (tiles, bytes)."""
+    img, bounds = load_source(src, bounds)
+    # Start from an empty directory so tiles that are empty in the new image don't linger
+    shutil.rmtree(dest, ignore_errors=True)
+    n_tiles = n_bytes = 0
+    for z in range(max_zoom + 1):
+        for y in range(2 ** z):
+            for x in range(2 ** z):
+                tile = render_tile(img, bounds, z, x, y)
+                if tile is None:
+                    continue
+                path = os.path.join(dest, str(z), str(y), f"{x}.png")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Quantized palette PNG: the hazard maps only use a handful of flat colors
+                Image.fromarray(tile).quantize(colors, method=Image.Quantize.FASTOCTREE).save(path, optimize=True)
+                n_tiles += 1
+                n_bytes += os.path.getsize(path)
+    return n_tiles, n_bytes
+
+
+def pyramid_url(layer):
+    """Folium tile URL template of a built pyramid, or ``None`` if it hasn't been built."""
+    if layer not in PYRAMIDS:
+        return None
+    _, slug, _ = PYRAMIDS[layer]
+    if not os.path.isdir(os.path.join(STATIC_TILE_DIR, slug, "0")):
+        return None
+    return f"{STATIC_TILE_URL}/{slug}/{{z}}/{{y}}/{{x}}.png"
+
+
+def max_native_zoom(layer):
+    """Highest zoom level with tiles of ``layer``; Leaflet upsamples beyond it."""
+    return PYRAMIDS[layer][2] if layer in PYRAMIDS else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--layer", default="Heatwaves", choices=list(PYRAMIDS))
+    parser.add_argument("--src", help="source image (defaults to the layer's image)")
+    parser.add_argument("--max-zoom", type=int, help="defaults to the layer's configured zoom")
+    parser.add_argument("--bounds", type=float, nargs=4, metavar=("WEST", "SOUTH", "EAST", "NORTH"))
+    args = parser.parse_args()
+
+    src, slug, zoom = PYRAMIDS[args.layer]
+    dest = os.path.join(STATIC_TILE_DIR, slug)
+    start = time.perf_counter()
+    n_tiles, n_bytes = build_pyramid(args.src or src, dest, args.max_zoom if args.max_zoom is not None else zoom, args.bounds)
+    print(f"Wrote {n_tiles} tiles ({n_bytes / 1024:.0f} KB) to {dest} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,63 @@
+"""What-if School Risk Index under user-chosen hazard weights.
+
+The composite is recomputed from the published sub-indices as a weighted
+``10 - geomean(10 - x)`` over the whole country matrix in one vectorized pass
+(see ``sri.pipeline.aggregate_sri``). A weight of 0 drops a hazard. The
+published SRI was computed from unrounded sub-indices, so the scenario is
+anchored to it: each country moves by the difference between the weighted and
+the equal-weight recomputation. With the default weights the published values
+come back unchanged.
+"""
+
+import numpy as np
+
+from sri.pipeline import SUBINDEX_COLUMNS, aggregate_sri, categorize
+
+
+DEFAULT_WEIGHTS = (1.0,) * len(SUBINDEX_COLUMNS)
+
+# Display names of the sub-indices, in SUBINDEX_COLUMNS order
+HAZARD_LABELS = {
+    "coastflood": "Coastal Flooding",
+    "rivflood": "Riverine Flooding",
+    "watersc": "Water Scarcity",
+    "heatwvs": "Heatwaves",
+    "pm25": "Air Pollution",
+    "cyclns": "Tropical Cyclones",
+}
+
+
+class WeightScenario:
+    """Recomputes SRI and categories for weight vectors over a fixed country table."""
+
+    def __init__(self, countries):
+        self.countries = countries
+        self.subindices = countries[SUBINDEX_COLUMNS].to_numpy(dtype="float64")
+        self.published = countries["SRI"].to_numpy(dtype="float64")
+        self.baseline = aggregate_sri(self.subindices)
+
+    def sri(self, weights):
+        """Scenario SRI per country for ``weights`` in ``SUBINDEX_COLUMNS`` order."""
+        weights = np.asarray(weights, dtype="float64")
+        if np.allclose(weights, DEFAULT_WEIGHTS):
+            return self.published.copy()
+        shifted = self.published + aggregate_sri(self.subindices, weights) - self.baseline
+        return np.clip(shifted, 0, 10).round(2)
+
+    def table(self, weights):
+        """The country table with ``SRI``, ``SRI_category`` and ``SRI_ncategory`` for ``weights``,
+        plus the published values as ``SRI (published)`` and ``SRI_category (published)``."""
+        out = self.countries.copy()
+        out["SRI (published)"] = out["SRI"]
+        out["SRI_category (published)"] = out["SRI_category"]
+        out["SRI"] = self.sri(weights)
+        category, ncat = categorize(out["SRI"])
+        out["SRI_category"] = np.asarray(category, dtype=object)
+        out["SRI_ncategory"] = ncat
+        return out
+
+
+def category_changes(table):
+    """Countries whose category differs from the published one."""
+    changed = table[table["SRI_category"] != table["SRI_category (published)"]]
+    return changed[["COUNTRY", "SRI (published)", "SRI", "SRI_category (published)", "SRI_category"]].reset_index(drop=True)
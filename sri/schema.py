@@ -0,0 +1,101 @@
+"""Compact in-memory schema for school tables.
+
+The school data as loaded by geopandas keeps a shapely Point per school, float64
+``lon``/``lat`` next to it, the eight 0/1 hazard flags as float64, and
+``Country``, ``School Name`` and the hazard labels as Python strings. For the
+same information, ``compact_schools`` keeps:
+
+- ``lon``/``lat`` as float32 arrays (about 1 m at the equator) and no geometry objects
+- ``Country`` and ``Hazards`` as categoricals, with at most 256 distinct labels for ``Hazards``
+- ``School Name`` as a categorical where names repeat a lot, otherwise Arrow strings
+- the hazard flags packed into ``hazard_mask`` (exposed) and ``hazard_missing`` (no data) uint8 bitmasks
+
+Compare the two layouts for the full school parquet with::
+
+    python -m sri.schema [path]
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from sri.hazards import HAZARD_BITS, HAZARD_COLUMNS, HAZARD_LABELS, encode_hazards
+from sri.store import SCHOOLS_PARQUET
+
+
+# Hazard label categories in bitmask order, so a mask is its own category code
+HAZARD_LABEL_DTYPE = pd.CategoricalDtype(HAZARD_LABELS)
+
+CATEGORICAL_MAX_UNIQUE = 0.5  # string columns with fewer distinct values than this share become categorical
+
+
+def compact_strings(values):
+    """Categorical if values repeat enough, otherwise Arrow-backed strings."""
+    values = pd.Series(values)
+    if values.nunique() < CATEGORICAL_MAX_UNIQUE * len(values):
+        return values.astype("category")
+    return values.astype("string[pyarrow]")
+
+
+def missing_mask(df):
+    """Bitmask of the hazard flags that are missing for each school."""
+    flags = df[HAZARD_COLUMNS].isna().to_numpy()
+    return (flags.astype(np.uint8) * HAZARD_BITS).sum(axis=1, dtype=np.uint8)
+
+
+def compact_schools(df):
+    """A compact copy of a school table (GeoDataFrame or frame with ``lon``/``lat``)."""
+    if "lon" in df.columns:
+        lon, lat = df["lon"], df["lat"]
+    else:
+        lon, lat = df.geometry.x, df.geometry.y
+
+    mask = encode_hazards(df)
+    out = pd.DataFrame({
+        "School Name": compact_strings(df["School Name"].to_numpy()),
+        "lon": lon.to_numpy(dtype="float32"),
+        "lat": lat.to_numpy(dtype="float32"),
+        "hazard_mask": mask,
+        "hazard_missing": missing_mask(df),
+        "Hazards": pd.Categorical.from_codes(mask, dtype=HAZARD_LABEL_DTYPE),
+    })
+    if "Country" in df.columns:
+        out.insert(1, "Country", pd.Categorical(df["Country"]))
+    return out
+
+
+def hazard_flags(compact):
+    """The eight 0/1 hazard columns (NaN where missing) back from the bitmasks."""
+    mask = compact["hazard_mask"].to_numpy()
+    missing = compact["hazard_missing"].to_numpy()
+    flags = {}
+    for hazard, bit in zip(HAZARD_COLUMNS, HAZARD_BITS):
+        flags[hazard] = np.where(missing & bit, np.nan, (mask & bit) > 0)
+    return pd.DataFrame(flags, index=compact.index)
+
+
+def memory_report(df):
+    """Deep memory use per column in MB, counting geometry objects at their shapely size."""
+    usage = df.memory_usage(deep=True, index=False) / 1e6
+    if hasattr(df, "geometry") and df.geometry.name in df.columns:
+        # memory_usage only sees the pointer array; each Point also holds a GEOS object (~100 bytes)
+        usage[df.geometry.name] += len(df) * 100 / 1e6
+    return usage.round(2)
+
+
+if __name__ == "__main__":
+    import geopandas as gpd
+
+    src = sys.argv[1] if len(sys.argv) > 1 else SCHOOLS_PARQUET
+    gdf = gpd.read_parquet(src)
+    gdf["lon"] = gdf.geometry.x
+    gdf["lat"] = gdf.geometry.y
+    before = memory_report(gdf)
+
+    compact = compact_schools(gdf)
+    after = memory_report(compact)
+
+    report = pd.concat([before.rename("before (MB)"), after.rename("after (MB)")], axis=1)
+    print(report.fillna(0).to_string())
+    print(f"\n{len(gdf):,} schools: {before.sum():.1f} MB -> {after.sum():.1f} MB ({before.sum() / after.sum():.1f}x smaller)")
@@ -0,0 +1,198 @@
+"""Packed grid index over all school locations for viewport and nearest-school queries.
+
+All schools from the store are written once to a single Arrow file, sorted by a
+fixed lon/lat grid cell (row-major, south to north). Any cell row of a viewport
+is then one contiguous slice of the file, so answering "which schools are in
+these bounds" takes at most one slice per cell row plus an exact bounds check
+on the candidates. No per-query scan of the whole dataset and no Python loop
+over points. The file is memory-mapped, so workers share the page cache and
+only the rows that are returned get materialized.
+
+Nearest-school lookups use the same index. The candidates are the cells of the
+bounding box of the search circle, ranked by exact haversine distance::
+
+    python -m sri.spatial      # build data/cache/school_grid.arrow
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from sri.hazards import HAZARD_BITS, HAZARD_COLUMNS, encode_hazards, hazard_labels
+from sri.store import STORE_DIR, list_countries, load_country, store_version
+
+
+INDEX_PATH = "data/cache/school_grid.arrow"
+CELL_DEG = 0.25  # 1440 x 720 cells worldwide
+
+# Most schools returned for one viewport; override with the SRI_VIEW_BUDGET environment variable
+VIEW_BUDGET = int(os.environ.get("SRI_VIEW_BUDGET", 5_000))
+
+EARTH_RADIUS_KM = 6371.0088
+
+N_COLS = int(360 / CELL_DEG)
+N_ROWS = int(180 / CELL_DEG)
+
+
+def _cell_xy(lon, lat):
+    x = np.clip(((np.asarray(lon) + 180) // CELL_DEG).astype(np.int64), 0, N_COLS - 1)
+    y = np.clip(((np.asarray(lat) + 90) // CELL_DEG).astype(np.int64), 0, N_ROWS - 1)
+    return x, y
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    """Great-circle distance in kilometres."""
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def search_boxes(lon, lat, radius_km):
+    """Lon/lat boxes ``(west, south, east, north)`` covering a circle, split at the antimeridian."""
+    dlat = np.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = lat - dlat, lat + dlat
+    if south <= -90 or north >= 90:
+        return [(-180.0, max(south, -90.0), 180.0, min(north, 90.0))]
+    # Widest longitude span of the circle, reached at its tangent points
+    dlon = np.degrees(np.arcsin(np.sin(radius_km / EARTH_RADIUS_KM) / np.cos(np.radians(lat))))
+    west, east = lon - dlon, lon + dlon
+    if west < -180:
+        return [(west + 360, south, 180.0, north), (-180.0, south, east, north)]
+    if east > 180:
+        return [(west, south, 180.0, north), (-180.0, south, east - 360, north)]
+    return [(west, south, east, north)]
+
+
+###########################
+# Build
+
+def build_index(dest=INDEX_PATH, store=STORE_DIR):
+    """Write every school in the store to ``dest``, sorted by grid cell."""
+    frames = []
+    for country in list_countries(store)["Country"]:
+        df = load_country(country, store=store)
+        frames.append(pd.DataFrame({
+            "School Name": df["School Name"],
+            "Country": country,
+            "lon": df["lon"].to_numpy(dtype="float64"),
+            "lat": df["lat"].to_numpy(dtype="float64"),
+            "hazard_mask": encode_hazards(df),
+        }))
+    schools = pd.concat(frames, ignore_index=True)
+    schools = schools[schools["lon"].notna() & schools["lat"].notna()]
+
+    x, y = _cell_xy(schools["lon"], schools["lat"])
+    schools["cell"] = (y * N_COLS + x).astype(np.int32)
+    schools = schools.sort_values("cell", kind="stable", ignore_index=True)
+    schools["Country"] = schools["Country"].astype("category")
+
+    table = pa.Table.from_pandas(schools, preserve_index=False)
+    table = table.replace_schema_metadata({"version": store_version(store), "cell_deg": str(CELL_DEG)})
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    # One record batch, so every column is a single contiguous buffer that maps to numpy without a copy
+    feather.write_feather(table, dest + ".tmp", compression="uncompressed", chunksize=max(table.num_rows, 1))
+    os.replace(dest + ".tmp", dest)
+    return table
+
+
+###########################
+# Query
+
+class SchoolGrid:
+    """Memory-mapped, cell-sorted table of all schools with per-cell row offsets."""
+
+    def __init__(self, table):
+        self.table = table
+        self.version = table.schema.metadata[b"version"].decode()
+        self.lon = table.column("lon").to_numpy()
+        self.lat = table.column("lat").to_numpy()
+        self.mask = table.column("hazard_mask").to_numpy()
+        counts = np.bincount(table.column("cell").to_numpy(), minlength=N_COLS * N_ROWS)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        return cls(feather.read_table(path, memory_map=True))
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def candidates(self, west, south, east, north):
+        """Rows in the grid cells overlapping the bounds (a superset of the schools inside)."""
+        (x0, x1), (y0, y1) = _cell_xy([west, east], [south, north])
+        starts = self.offsets[np.arange(y0, y1 + 1) * N_COLS + x0]
+        stops = self.offsets[np.arange(y0, y1 + 1) * N_COLS + x1 + 1]
+        if x0 == 0 and x1 == N_COLS - 1:
+            # Full-width rows are contiguous with each other
+            return np.arange(starts[0], stops[-1])
+        # At most one slice per cell row (720 worldwide)
+        return np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)])
+
+    def query(self, west, south, east, north, hazards=(), mode="all", budget=VIEW_BUDGET):
+        """Schools inside the bounds, at most ``budget`` of them.
+
+        Returns ``(schools, n_total)``. ``n_total`` counts every matching school
+        in view. When it exceeds the budget, an evenly strided sample is returned.
+        The rows are cell-sorted, so the sample stays spread over the viewport.
+        """
+        west, east = max(west, -180.0), min(east, 180.0)
+        south, north = max(south, -90.0), min(north, 90.0)
+        if west > east or south > north:
+            return self.table.slice(0, 0).to_pandas(), 0
+
+        rows = self.candidates(west, south, east, north)
+        lon, lat = self.lon[rows], self.lat[rows]
+        keep = (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+        if hazards:
+            wanted = np.bitwise_or.reduce([HAZARD_BITS[HAZARD_COLUMNS.index(h)] for h in hazards])
+            hits = self.mask[rows] & wanted
+            keep &= (hits == wanted) if mode == "all" else (hits > 0)
+        rows = rows[keep]
+
+        n_total = len(rows)
+        if n_total > budget:
+            rows = rows[np.linspace(0, n_total - 1, budget).astype(np.int64)]
+        schools = self.table.take(rows).to_pandas()
+        schools["Hazards"] = hazard_labels(schools["hazard_mask"])
+        return schools, n_total
+
+    def nearest(self, lon, lat, k=20, radius_km=10.0):
+        """The ``k`` schools closest to a point within ``radius_km``, nearest first.
+
+        Returns ``(schools, n_within)``. ``schools`` has a ``distance_km`` column,
+        and ``n_within`` counts all schools inside the radius.
+        """
+        rows = np.concatenate([self.candidates(*box) for box in search_boxes(lon, lat, radius_km)])
+        distance = haversine_km(lon, lat, self.lon[rows], self.lat[rows])
+        inside = distance <= radius_km
+        rows, distance = rows[inside], distance[inside]
+
+        n_within = len(rows)
+        if n_within > k:
+            top = np.argpartition(distance, k)[:k]
+            rows, distance = rows[top], distance[top]
+        order = np.argsort(distance, kind="stable")
+        schools = self.table.take(rows[order]).to_pandas()
+        schools["distance_km"] = distance[order]
+        schools["Hazards"] = hazard_labels(schools["hazard_mask"])
+        return schools, n_within
+
+
+def load_grid(path=INDEX_PATH, store=STORE_DIR):
+    """The persisted grid if it matches the store, otherwise a freshly built one."""
+    if os.path.exists(path):
+        table = feather.read_table(path, memory_map=True)
+        if table.schema.metadata[b"version"].decode() == store_version(store) and table.column("lon").num_chunks <= 1:
+            return SchoolGrid(table)
+    build_index(path, store)
+    return SchoolGrid.load(path)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    table = build_index()
+    print(f"Indexed {table.num_rows:,} schools on a {CELL_DEG}° grid to {INDEX_PATH} in {time.perf_counter() - start:.1f}s")
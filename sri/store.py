@@ -0,0 +1,95 @@
+"""Per-country partitioned store of the school exposure data.
+
+The dashboard only ever looks at one country at a time, so instead of loading
+all 1.3M schools into every worker the school parquet is split once into a
+Hive-style store (one ``Country=<name>`` directory per country) and pages read
+just the partition and columns they need.
+
+Build the store after each data refresh with::
+
+    python -m sri.store
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from sri.hazards import HAZARD_COLUMNS
+
+
+SCHOOLS_PARQUET = "data/schools_exposure_cleaned.parquet"
+STORE_DIR = "data/schools_store"
+MANIFEST = "_manifest.csv"  # leading underscore: ignored by parquet dataset discovery
+
+SCHOOL_COLUMNS = ["School Name", "lon", "lat"] + HAZARD_COLUMNS
+
+
+###########################
+# Build
+
+def build_store(src=SCHOOLS_PARQUET, dest=STORE_DIR):
+    """Write the school parquet as one partition per country, with lon/lat instead of geometry."""
+    import geopandas as gpd
+
+    gdf = gpd.read_parquet(src)
+    df = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+    df["lon"] = gdf.geometry.x.to_numpy()
+    df["lat"] = gdf.geometry.y.to_numpy()
+    df = df[df["Country"].notna()]
+
+    # Start from an empty directory so countries dropped from the source don't linger
+    shutil.rmtree(dest, ignore_errors=True)
+    table = pa.Table.from_pandas(df[["Country"] + SCHOOL_COLUMNS], preserve_index=False)
+    pq.write_to_dataset(table, dest, partition_cols=["Country"])
+
+    manifest = df.groupby("Country").size().rename("n_schools").reset_index()
+    manifest["checksum"] = partition_checksums(df).reindex(manifest["Country"]).to_numpy()
+    manifest.to_csv(os.path.join(dest, MANIFEST), index=False)
+    return manifest
+
+
+def partition_checksums(df):
+    """Order-independent content hash of each country's rows, as hex strings."""
+    row_hashes = pd.util.hash_pandas_object(df[SCHOOL_COLUMNS], index=False)
+    sums = row_hashes.groupby(df["Country"].to_numpy()).sum()
+    return sums.map("{:016x}".format)
+
+
+###########################
+# Read
+
+def list_countries(store=STORE_DIR):
+    """Countries in the store with their school counts and checksums, without touching any partition."""
+    return pd.read_csv(os.path.join(store, MANIFEST), dtype={"checksum": str}).sort_values("Country", ignore_index=True)
+
+
+def store_version(store=STORE_DIR):
+    """Short hash of the manifest checksums, for keying indexes derived from the whole store."""
+    checksums = list_countries(store)["checksum"].astype(str)
+    return hashlib.sha1("".join(checksums).encode()).hexdigest()[:12]
+
+
+def load_country(country, columns=SCHOOL_COLUMNS, store=STORE_DIR):
+    """Read the schools of a single country, pruned to ``columns``."""
+    df = pd.read_parquet(
+        store,
+        engine="pyarrow",
+        columns=list(columns),
+        filters=[("Country", "==", country)],
+        memory_map=True,
+    )
+    return df.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else SCHOOLS_PARQUET
+    start = time.perf_counter()
+    manifest = build_store(src)
+    print(f"Wrote {manifest['n_schools'].sum():,} schools in {len(manifest)} partitions "
+          f"to {STORE_DIR} ({time.perf_counter() - start:.1f}s)")
@@ -0,0 +1,209 @@
+"""Caching tile proxy for the hazard raster maps.
+
+The hazard maps are ArcGIS MapServer tile services. Instead of every visitor
+pulling each tile from ``tiles.arcgis.com``, the proxy serves
+``/tiles/<layer>/{z}/{y}/{x}`` from a disk-backed LRU store (a single SQLite
+file, one row per tile) and only goes upstream on a miss. Hit/miss counters
+are available at ``/stats``.
+
+Run the proxy and point the dashboard at it::
+
+    python -m sri.tiles serve --port 8765
+    SRI_TILE_PROXY_URL=http://localhost:8765 streamlit run 01_Home.py
+
+Pre-seed the store with every tile of zoom levels 0-6 of all layers::
+
+    python -m sri.tiles seed --max-zoom 6
+
+``--upstream`` replaces the ArcGIS URLs with one ``{layer}`` template, e.g. a
+local stand-in tile server for testing.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+ARCGIS = "https://tiles.arcgis.com/tiles/OO2s4OoyCZkYJ6oE/arcgis/rest/services/{service}/MapServer/tile/{{z}}/{{y}}/{{x}}"
+
+TILE_URLS = {
+    "OVERLAY": ARCGIS.format(service="OverlayMap_V1"),
+    "Water Scarcity": ARCGIS.format(service="WaterScarcity_V4"),
+    "Riverine Flooding": ARCGIS.format(service="RiverineFlooding_V1"),
+    "Coastal Flooding": ARCGIS.format(service="CoastalFlooding_V2"),
+    "Tropical Cyclones": ARCGIS.format(service="TropicalCyclones_V2"),
+    "Air Pollution": ARCGIS.format(service="AirPollution_V1"),
+}
+
+TILE_DB = "data/cache/tiles.sqlite"
+MAX_BYTES = 2 * 1024 ** 3
+
+
+def layer_slug(layer):
+    return layer.lower().replace(" ", "-")
+
+
+def tile_urls(proxy=None):
+    """Tile URL template per layer: through the proxy when ``SRI_TILE_PROXY_URL`` (or ``proxy``) is set."""
+    proxy = proxy or os.environ.get("SRI_TILE_PROXY_URL")
+    if not proxy:
+        return dict(TILE_URLS)
+    return {layer: f"{proxy.rstrip('/')}/tiles/{layer_slug(layer)}/{{z}}/{{y}}/{{x}}" for layer in TILE_URLS}
+
+
+###########################
+# Disk-backed LRU store
+
+class TileCache:
+    """Tiles of all layers in one SQLite file, evicting least recently used tiles above ``max_bytes``."""
+
+    def __init__(self, path=TILE_DB, upstream=None, max_bytes=MAX_BYTES, timeout=10):
+        self.upstream = {layer_slug(k): v for k, v in (upstream or TILE_URLS).items()}
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.hits = self.misses = self.errors = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tiles ("
+            "layer TEXT, z INTEGER, x INTEGER, y INTEGER, data BLOB, content_type TEXT, accessed REAL, "
+            "PRIMARY KEY (layer, z, x, y))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS tiles_accessed ON tiles (accessed)")
+        self._size = self._db.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM tiles").fetchone()[0]
+
+    def get(self, layer, z, y, x):
+        """``(data, content_type)`` of a tile, from the store or upstream; ``None`` if upstream has none."""
+        key = (layer, z, x, y)
+        with self._lock:
+            row = self._db.execute("SELECT data, content_type FROM tiles WHERE layer=? AND z=? AND x=? AND y=?", key).fetchone()
+            if row is not None:
+                self.hits += 1
+                self._db.execute("UPDATE tiles SET accessed=? WHERE layer=? AND z=? AND x=? AND y=?", (time.time(), *key))
+                self._db.commit()
+                return row
+
+        tile = self._fetch(layer, z, y, x)
+        with self._lock:
+            if tile is None:
+                self.errors += 1
+                return None
+            self.misses += 1
+            self._put(key, *tile)
+        return tile
+
+    def _fetch(self, layer, z, y, x):
+        url = self.upstream[layer].format(layer=layer, z=z, y=y, x=x)
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as resp:
+                return resp.read(), resp.headers.get_content_type()
+        except (urllib.error.URLError, TimeoutError):
+            return None
+
+    def _put(self, key, data, content_type):
+        old = self._db.execute("SELECT LENGTH(data) FROM tiles WHERE layer=? AND z=? AND x=? AND y=?", key).fetchone()
+        self._db.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?, ?, ?)", (*key, data, content_type, time.time()))
+        self._size += len(data) - (old[0] if old else 0)
+        while self._size > self.max_bytes:
+            rows = self._db.execute("SELECT layer, z, x, y, LENGTH(data) FROM tiles ORDER BY accessed LIMIT 64").fetchall()
+            for *old_key, size in rows:
+                self._db.execute("DELETE FROM tiles WHERE layer=? AND z=? AND x=? AND y=?", old_key)
+                self._size -= size
+                if self._size <= self.max_bytes:
+                    break
+        self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            n = self._db.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "errors": self.errors, "tiles": n, "bytes": self._size}
+
+
+###########################
+# HTTP proxy
+
+def make_handler(cache):
+    class TileHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            if parts == ["stats"]:
+                return self._send(200, json.dumps(cache.stats()).encode(), "application/json")
+            if len(parts) != 5 or parts[0] != "tiles" or parts[1] not in cache.upstream or not all(p.isdigit() for p in parts[2:]):
+                return self._send(404, b"not found", "text/plain")
+            z, y, x = map(int, parts[2:])
+            tile = cache.get(parts[1], z, y, x)
+            if tile is None:
+                return self._send(502, b"upstream unavailable", "text/plain")
+            self._send(200, *tile)
+
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            if status == 200:
+                self.send_header("Cache-Control", "public, max-age=86400")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return TileHandler
+
+
+def serve(cache, host="127.0.0.1", port=8765):
+    server = ThreadingHTTPServer((host, port), make_handler(cache))
+    print(f"Serving tiles on http://{host}:{port}/tiles/<layer>/{{z}}/{{y}}/{{x}} (stats at /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+###########################
+# Seeding
+
+def seed(cache, max_zoom=6, layers=None, workers=8):
+    """Fetch every tile of zoom levels ``0..max_zoom`` of ``layers`` into the store."""
+    layers = layers or list(cache.upstream)
+    jobs = [(layer, z, y, x) for layer in layers for z in range(max_zoom + 1) for y in range(2 ** z) for x in range(2 ** z)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        for i, _ in enumerate(pool.map(lambda job: cache.get(*job), jobs), 1):
+            if i % 1000 == 0 or i == len(jobs):
+                print(f"  {i:,}/{len(jobs):,} tiles ({time.perf_counter() - start:.0f}s)")
+    return cache.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["serve", "seed"])
+    parser.add_argument("--db", default=TILE_DB)
+    parser.add_argument("--upstream", help="URL template with {layer}, {z}, {y}, {x} used for every layer instead of ArcGIS")
+    parser.add_argument("--max-bytes", type=int, default=MAX_BYTES)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-zoom", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    upstream = {layer: args.upstream for layer in TILE_URLS} if args.upstream else None
+    cache = TileCache(args.db, upstream=upstream, max_bytes=args.max_bytes)
+    if args.command == "serve":
+        serve(cache, args.host, args.port)
+    else:
+        print(seed(cache, args.max_zoom, workers=args.workers))
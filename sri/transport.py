@@ -0,0 +1,49 @@
+"""Compact serialization of map data for pydeck layers.
+
+``st.pydeck_chart`` ships layers to the browser as deck.gl JSON (pydeck's binary
+transport only works inside Jupyter widgets), so the cheapest payload is one
+short record per row: a single ``p`` position pair rounded to float32 precision
+and only the columns the layer or tooltip actually reads. Missing values are
+left out of the record unless a ``fill`` text is needed for display.
+``geojson_points`` does the same for folium layers, which take GeoJSON.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+
+def deck_records(df, columns=(), position=("lon", "lat"), decimals=5, fill=None):
+    """Rows of ``df`` as compact deck.gl records. Use with ``get_position="p"``."""
+    # Round through float32: ~1 m at 5 decimals and short JSON numbers
+    pos = np.round(df[list(position)].to_numpy(dtype="float32").astype("float64"), decimals).tolist()
+    records = [{"p": p} for p in pos]
+    for col in columns:
+        values = df[col].to_numpy(dtype=object)
+        present = pd.notna(values)
+        for record, value, keep in zip(records, values, present):
+            if keep:
+                record[col] = value.item() if isinstance(value, np.generic) else value
+            elif fill is not None:
+                record[col] = fill
+    return records
+
+
+def geojson_points(df, columns=(), position=("lon", "lat"), decimals=5, fill=None):
+    """Rows of ``df`` as a GeoJSON FeatureCollection of points, for ``folium.GeoJson``."""
+    records = deck_records(df, columns, position, decimals, fill)
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": r.pop("p")}, "properties": r}
+            for r in records
+        ],
+    }
+
+
+def payload_bytes(data):
+    """Size of ``data`` as the JSON the browser receives, for comparing serializations."""
+    if isinstance(data, pd.DataFrame):
+        data = data.to_dict(orient="records")
+    return len(json.dumps(data, default=str).encode("utf-8"))
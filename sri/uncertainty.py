@@ -0,0 +1,148 @@
+"""Coverage-aware bootstrap uncertainty for the country SRI.
+
+OpenStreetMap covers only part of each country's schools (``PERCENT COVERED``
+in the validation table), so the exposure shares behind the SRI are estimates.
+Each replicate keeps the mapped schools and draws the unmapped remainder,
+``n * (1 - coverage) / coverage`` schools, from the country's observed
+distribution of hazard combinations. That is a multinomial over the 256 hazard
+bitmasks, which is the same as resampling whole schools but costs O(256) per
+country. The combined counts are scaled back to the mapped total and scored
+with the national pipeline (min-max across countries within each replicate).
+Fully covered countries get no spread; poorly covered ones get wide intervals.
+
+Coverage comes from ``sri.coverage``: the live OSM count over the government
+count, or for countries outside the validation sample the median of their
+region and income group. Like the what-if weights (``sri.scenario``), replicates are
+anchored to the published SRI. The results are the interval of the SRI and the
+probability that the country's category differs from the published one::
+
+    python -m sri.uncertainty [--replicates 2000] [--workers 4]
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from sri.coverage import VALIDATION_CSV, country_coverage, load_meta
+from sri.hazards import HAZARD_BITS, HAZARD_COLUMNS, encode_hazards
+from sri.pipeline import SRI_BINS, SUBINDICES, aggregate_sri, minmax, stage
+from sri.store import STORE_DIR, list_countries, load_country
+
+
+UNCERTAINTY_CSV = "data/sri_uncertainty.csv"
+
+N_REPLICATES = 1000
+BATCH_SIZE = 100     # replicates scored per array operation
+INTERVAL = 0.9
+
+# Hazard flags of each of the 256 bitmasks, for turning mask counts into exposure counts
+MASK_FLAGS = ((np.arange(256)[:, None] & HAZARD_BITS) > 0).astype("float64")
+
+
+###########################
+# Inputs
+
+def mask_histograms(store=STORE_DIR):
+    """Schools per hazard bitmask and valid (non-missing) schools per hazard, by country."""
+    hist, valid = {}, {}
+    for country in list_countries(store)["Country"]:
+        df = load_country(country, columns=HAZARD_COLUMNS, store=store)
+        hist[country] = np.bincount(encode_hazards(df), minlength=256)
+        valid[country] = df[HAZARD_COLUMNS].notna().sum().to_numpy()
+    return (pd.DataFrame.from_dict(hist, orient="index"),
+            pd.DataFrame.from_dict(valid, orient="index", columns=HAZARD_COLUMNS))
+
+
+###########################
+# Replicates
+
+def sri_arrays(exposed, valid):
+    """SRI from exposure counts of shape ``(..., countries, hazards)``, as in ``sri.pipeline.score``."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = np.where(valid > 0, exposed / valid, np.nan)
+    indicators = (minmax(np.log1p(exposed), axis=-2) + minmax(share, axis=-2)) / 2
+    sub = []
+    for columns, how in SUBINDICES.values():
+        values = indicators[..., [HAZARD_COLUMNS.index(c) for c in columns]]
+        if how == "geomean":
+            with np.errstate(divide="ignore"):
+                sub.append(np.exp(np.log(values).mean(axis=-1)))
+        else:
+            sub.append(values.mean(axis=-1))
+    return aggregate_sri(np.stack(sub, axis=-1))
+
+
+def _replicate_batch(args):
+    hist, valid, unmapped, size, seed = args
+    rng = np.random.default_rng(seed)
+    n = hist.sum(axis=1)
+    probs = hist / np.maximum(n, 1)[:, None]
+    draws = rng.multinomial(unmapped, probs, size=(size, len(hist)))     # (replicates, countries, 256)
+    scale = (n / np.maximum(n + unmapped, 1))[:, None]
+    exposed = ((hist + draws) * scale) @ MASK_FLAGS                       # (replicates, countries, hazards)
+    return sri_arrays(exposed, valid)
+
+
+def bootstrap_sri(hist, valid, coverage, n_replicates=N_REPLICATES, workers=1, seed=0):
+    """``(n_replicates, countries)`` array of replicate SRI values. Seeded per batch, so independent of ``workers``."""
+    hist = np.asarray(hist, dtype=np.int64)
+    valid = np.asarray(valid, dtype="float64")
+    coverage = np.clip(np.asarray(coverage, dtype="float64"), 1e-3, 1.0)
+    unmapped = np.round(hist.sum(axis=1) * (1 - coverage) / coverage).astype(np.int64)
+
+    sizes = [min(BATCH_SIZE, n_replicates - i) for i in range(0, n_replicates, BATCH_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(hist, valid, unmapped, size, s) for size, s in zip(sizes, seeds)]
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            parts = list(pool.map(_replicate_batch, jobs))
+    else:
+        parts = [_replicate_batch(job) for job in jobs]
+    return np.concatenate(parts)
+
+
+def summarize(published, baseline, replicates, interval=INTERVAL):
+    """Interval bounds and category-change probability, anchored to the published SRI."""
+    anchored = np.clip(published + (replicates - baseline), 0, 10)
+    tail = (1 - interval) / 2
+    low, high = np.nanquantile(anchored, [tail, 1 - tail], axis=0)
+    category = np.digitize(anchored.round(2), SRI_BINS[1:-1], right=True)
+    published_category = np.digitize(published, SRI_BINS[1:-1], right=True)
+    return pd.DataFrame({
+        "SRI_low": low.round(2),
+        "SRI_high": high.round(2),
+        "p_category_change": (category != published_category).mean(axis=0).round(3),
+    })
+
+
+def run(out=UNCERTAINTY_CSV, n_replicates=N_REPLICATES, workers=1, seed=0):
+    timings = {}
+    with stage("inputs", timings):
+        meta = load_meta()
+        _, estimates = country_coverage(meta, pd.read_csv(VALIDATION_CSV))
+        hist, valid = mask_histograms()
+        meta = meta[meta["COUNTRY"].isin(hist.index)].reset_index(drop=True)
+        hist, valid = hist.loc[meta["COUNTRY"]], valid.loc[meta["COUNTRY"]]
+        coverage = estimates.loc[meta["COUNTRY"], "coverage"]
+    with stage("bootstrap", timings):
+        baseline = sri_arrays(hist.to_numpy() @ MASK_FLAGS, valid.to_numpy())
+        replicates = bootstrap_sri(hist, valid, coverage, n_replicates, workers, seed)
+    with stage("write", timings):
+        result = summarize(meta["SRI"].to_numpy(), baseline, replicates)
+        result.insert(0, "COUNTRY", meta["COUNTRY"])
+        result.insert(1, "coverage", coverage.to_numpy().round(3))
+        result.to_csv(out, index=False)
+    print(f"Wrote {n_replicates:,}-replicate intervals for {len(result)} countries to {out} ({sum(timings.values()):.2f}s total)")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=UNCERTAINTY_CSV)
+    parser.add_argument("--replicates", type=int, default=N_REPLICATES)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.out, args.replicates, args.workers, args.seed)
@@ -0,0 +1,136 @@
+"""Missing-data validation tables for the hazard layers.
+
+Recomputes the ``Missing (%)`` tables in ``data/climate validation/``: for each
+hazard source, the share of every country's schools whose flag is null (the
+school falls on nodata in the hazard layer). The school parquet is streamed in
+record batches and, per batch, the missing flags of all hazards are packed into
+one bitmask (``sri.schema.missing_mask``). A single ``np.bincount`` over
+``country * 256 + mask`` then counts every country and missing pattern at once,
+and each table is the sum of the patterns that touch its hazards.
+
+Before the tables are overwritten, they are compared with the previous run.
+Countries whose share rose by more than ``TOLERANCE`` points, or that appear
+for the first time, are reported as regressions and make the command exit
+with status 1, so it can gate a data refresh. On regressions the previous
+tables are kept, so the gate keeps failing until the new tables are accepted
+with ``--accept``. Tables without a previous run have nothing to compare
+against::
+
+    python -m sri.validation [--src data/schools_exposure_cleaned.parquet] [--out "data/climate validation"] [--accept]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from sri.hazards import HAZARD_BITS, HAZARD_COLUMNS
+from sri.pipeline import BATCH_SIZE, stage
+from sri.schema import missing_mask
+from sri.store import SCHOOLS_PARQUET
+
+
+VALIDATION_DIR = "data/climate validation"
+
+# Table file -> hazard columns of one source layer (a school is missing if any of them is)
+MISSING_TABLES = {
+    "AQ_missing.csv": ["PM2.5 above 9μg/m³", "PM2.5 above 35μg/m³"],
+    "coastalflooding_missing.csv": ["Coastal Flooding"],
+    "riverineflooding_missing.csv": ["Riverine Flooding"],
+    "waterscarcity_missing.csv": ["Water Scarcity"],
+    "heatwaves_missing.csv": ["Heatwaves"],
+    "cyclones_missing.csv": ["Cyclones Cat 1&2", "Cyclones Cat 3+"],
+}
+
+TOLERANCE = 0.5  # percentage points a country's missing share may rise before it counts as a regression
+
+
+###########################
+# Counting
+
+def missing_patterns(src=SCHOOLS_PARQUET):
+    """Schools per country and missing-hazard bitmask, as a ``(countries, 256)`` frame."""
+    counts = {}
+    for batch in pq.ParquetFile(src).iter_batches(BATCH_SIZE, columns=["Country"] + HAZARD_COLUMNS):
+        df = batch.to_pandas()
+        codes, countries = pd.factorize(df["Country"])
+        keep = codes >= 0  # schools without a country, as build_store drops them
+        hist = np.bincount(codes[keep] * 256 + missing_mask(df)[keep], minlength=len(countries) * 256).reshape(-1, 256)
+        for country, row in zip(countries, hist):
+            counts[country] = counts[country] + row if country in counts else row
+    return pd.DataFrame.from_dict(counts, orient="index").sort_index()
+
+
+def missing_tables(patterns, tables=MISSING_TABLES):
+    """``Missing (%)`` per country for each table, keeping only countries with missing values."""
+    masks = np.arange(256)
+    n_schools = patterns.sum(axis=1)
+    out = {}
+    for name, columns in tables.items():
+        bits = np.bitwise_or.reduce([HAZARD_BITS[HAZARD_COLUMNS.index(c)] for c in columns])
+        missing = patterns.loc[:, (masks & bits) > 0].sum(axis=1)
+        share = (100 * missing / n_schools).round(2)
+        out[name] = share[share > 0].rename_axis("Country").rename("Missing (%)").reset_index()
+    return out
+
+
+###########################
+# Regressions
+
+def read_table(path):
+    """A previously written table as a ``Country -> Missing (%)`` series, or None before its first run."""
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, index_col=0).set_index("Country")["Missing (%)"]
+
+
+def find_regressions(previous, current, tolerance=TOLERANCE):
+    """Countries whose missing share rose by more than ``tolerance`` points (new countries start from 0)."""
+    both = pd.concat([previous.rename("previous"), current.rename("current")], axis=1).fillna(0.0)
+    both["change"] = (both["current"] - both["previous"]).round(2)
+    return both[both["change"] > tolerance].rename_axis("Country").reset_index()
+
+
+def run(src=SCHOOLS_PARQUET, out=VALIDATION_DIR, tolerance=TOLERANCE, accept=False):
+    timings = {}
+    with stage("count", timings):
+        patterns = missing_patterns(src)
+    with stage("compare", timings):
+        tables = missing_tables(patterns)
+        regressions = []
+        for name, table in tables.items():
+            previous = read_table(os.path.join(out, name))
+            if previous is not None:
+                found = find_regressions(previous, table.set_index("Country")["Missing (%)"], tolerance)
+                regressions.append(found.assign(table=name))
+        columns = ["table", "Country", "previous", "current", "change"]
+        regressions = pd.concat(regressions, ignore_index=True)[columns] if regressions else pd.DataFrame(columns=columns)
+    if len(regressions) and not accept:
+        print(f"{len(regressions)} regressions (missing share up by more than {tolerance} points), keeping the tables in {out}:")
+        print(regressions.to_string(index=False))
+        print("\nRe-run with --accept to write the new tables.")
+        return tables, regressions
+    with stage("write", timings):
+        os.makedirs(out, exist_ok=True)
+        for name, table in tables.items():
+            table.to_csv(os.path.join(out, name))
+    print(f"Wrote {len(tables)} missing-data tables for {len(patterns)} countries to {out} ({sum(timings.values()):.2f}s total)")
+    if len(regressions):
+        print(f"\nAccepted {len(regressions)} regressions (missing share up by more than {tolerance} points):")
+        print(regressions.to_string(index=False))
+        regressions = regressions.iloc[:0]
+    return tables, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--src", default=SCHOOLS_PARQUET)
+    parser.add_argument("--out", default=VALIDATION_DIR)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--accept", action="store_true", help="write the new tables even if they have regressions")
+    args = parser.parse_args()
+    _, regressions = run(args.src, args.out, args.tolerance, args.accept)
+    sys.exit(1 if len(regressions) else 0)
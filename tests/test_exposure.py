@@ -0,0 +1,99 @@
+"""Block-wise raster sampling against a per-point lookup on small synthetic rasters (python -m pytest tests/test_exposure.py)."""
+
+import numpy as np
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+from rasterio.transform import from_origin
+
+from sri.exposure import COMPARE, compute_exposure, raster_path, sample_raster
+
+WIDTH, HEIGHT, RES = 50, 40, 0.5  # 25 x 20 degrees, exact in binary so cell edges are exact
+WEST, NORTH = 10.0, 5.0
+NODATA = -9999.0
+BLOCK = 16  # does not divide the raster, so the last blocks are partial
+
+
+def write_raster(path, values, **layout):
+    profile = dict(driver="GTiff", width=WIDTH, height=HEIGHT, count=1, dtype="float32",
+                   crs="EPSG:4326", transform=from_origin(WEST, NORTH, RES, RES), nodata=NODATA, **layout)
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(values.astype("float32"), 1)
+    with rasterio.open(path) as src:
+        return src.block_shapes[0]
+
+
+def synthetic_values(seed=0):
+    values = np.random.default_rng(seed).uniform(0, 100, (HEIGHT, WIDTH)).round(1)
+    values[::7, ::5] = NODATA
+    return values
+
+
+def sample_points(seed=0):
+    """Random points, points on every block and cell edge, on nodata cells and outside the raster."""
+    rng = np.random.default_rng(seed)
+    lon = list(rng.uniform(WEST - 2, WEST + WIDTH * RES + 2, 2000))
+    lat = list(rng.uniform(NORTH - HEIGHT * RES - 2, NORTH + 2, 2000))
+    for edge in range(max(WIDTH, HEIGHT) + 1):
+        for offset in (-1e-9, 0.0, 1e-9):
+            lon += [WEST + edge * RES + offset, WEST + (WIDTH - 1) * RES]
+            lat += [NORTH - 1e-3, NORTH - edge * RES + offset]
+    lon += [WEST + 0.1, WEST + WIDTH * RES, WEST - 1e-9]  # a nodata cell, just past the east and west edges
+    lat += [NORTH - 0.1, NORTH - 1.0, NORTH - 1.0]
+    return np.array(lon), np.array(lat)
+
+
+def brute_force(path, lon, lat):
+    with rasterio.open(path) as src:
+        values = src.read(1, masked=True)
+        out = np.full(len(lon), np.nan)
+        for i, (x, y) in enumerate(zip(lon, lat)):
+            row, col = src.index(x, y)
+            if 0 <= row < src.height and 0 <= col < src.width and not values.mask[row, col]:
+                out[i] = values[row, col]
+    return out
+
+
+@pytest.mark.parametrize("layout, blocks", [
+    (dict(tiled=True, blockxsize=BLOCK, blockysize=BLOCK), (BLOCK, BLOCK)),
+    (dict(tiled=False, blockysize=3), (3, WIDTH)),
+])
+def test_sample_raster(tmp_path, layout, blocks):
+    path = str(tmp_path / "hazard.tif")
+    values = synthetic_values()
+    assert write_raster(path, values, **layout) == blocks
+
+    lon, lat = sample_points()
+    sampled = sample_raster(path, lon, lat)
+    expected = brute_force(path, lon, lat)
+
+    np.testing.assert_array_equal(sampled, expected)
+    assert np.isnan(sampled).any() and (~np.isnan(sampled)).sum() > 1000
+    assert np.isnan(sampled[-3:]).all()  # nodata, east edge (exclusive), west of the raster
+
+
+def test_sample_raster_all_outside(tmp_path):
+    path = str(tmp_path / "hazard.tif")
+    write_raster(path, synthetic_values(), tiled=True, blockxsize=BLOCK, blockysize=BLOCK)
+    sampled = sample_raster(path, [WEST - 5, WEST + WIDTH * RES + 5], [NORTH - 1, NORTH + 5])
+    assert sampled.shape == (2,) and np.isnan(sampled).all()
+    assert sample_raster(path, [], []).shape == (0,)
+
+
+def test_compute_exposure(tmp_path):
+    rules = {
+        "Heatwaves": ("heatwaves", ">=", 50),
+        "Cyclones Cat 1&2": ("cyclone_wind", ">=", 30),
+        "Cyclones Cat 3+": ("cyclone_wind", ">=", 70),
+    }
+    for seed, source in enumerate(["heatwaves", "cyclone_wind"]):
+        write_raster(raster_path(source, str(tmp_path)), synthetic_values(seed), tiled=True, blockxsize=BLOCK, blockysize=BLOCK)
+
+    lon, lat = sample_points(seed=1)
+    for workers in (1, 2):
+        flags = compute_exposure(lon, lat, str(tmp_path), rules=rules, workers=workers)
+        assert list(flags.columns) == ["Heatwaves", "Cyclones Cat 1&2", "Cyclones Cat 3+"]
+        for hazard, (source, op, threshold) in rules.items():
+            v = brute_force(raster_path(source, str(tmp_path)), lon, lat)
+            expected = np.where(np.isnan(v), np.nan, COMPARE[op](v, threshold))
+            np.testing.assert_array_equal(flags[hazard].to_numpy(), expected)
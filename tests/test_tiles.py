@@ -0,0 +1,118 @@
+"""Tile proxy against a local stand-in tile server (python -m pytest tests/test_tiles.py)."""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from sri.tiles import TileCache, make_handler
+
+TILE_SIZE = 100
+MAX_ZOOM = 2  # the stand-in has no tiles deeper than this
+
+
+def start(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@pytest.fixture
+def upstream():
+    """Stand-in tile server: ``/<layer>/{z}/{y}/{x}`` gives a fixed-size tile, 404 below ``MAX_ZOOM``."""
+    requests = []
+
+    class StandIn(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            z = int(self.path.split("/")[2])
+            body = self.path.encode().ljust(TILE_SIZE, b".")
+            self.send_response(200 if z <= MAX_ZOOM else 404)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server, url = start(StandIn)
+    yield url + "/{layer}/{z}/{y}/{x}", requests
+    server.shutdown()
+    server.server_close()
+
+
+def make_cache(tmp_path, upstream, **kwargs):
+    template, _ = upstream
+    return TileCache(str(tmp_path / "tiles.sqlite"), upstream={"Water Scarcity": template, "OVERLAY": template}, **kwargs)
+
+
+def test_hits_and_misses(tmp_path, upstream):
+    cache = make_cache(tmp_path, upstream)
+    _, requests = upstream
+
+    data, content_type = cache.get("water-scarcity", 1, 0, 1)
+    assert data.startswith(b"/water-scarcity/1/0/1") and content_type == "image/png"
+    assert cache.get("water-scarcity", 1, 0, 1)[0] == data
+    cache.get("overlay", 1, 0, 1)
+
+    assert requests == ["/water-scarcity/1/0/1", "/overlay/1/0/1"]
+    assert cache.stats() == {"hits": 1, "misses": 2, "errors": 0, "tiles": 2, "bytes": 2 * TILE_SIZE}
+
+
+def test_store_persists(tmp_path, upstream):
+    make_cache(tmp_path, upstream).get("overlay", 0, 0, 0)
+    cache = make_cache(tmp_path, upstream)
+    assert cache.get("overlay", 0, 0, 0) is not None
+    assert cache.stats()["hits"] == 1 and len(upstream[1]) == 1
+
+
+def test_upstream_404(tmp_path, upstream):
+    cache = make_cache(tmp_path, upstream)
+    assert cache.get("overlay", MAX_ZOOM + 1, 0, 0) is None
+    assert cache.get("overlay", MAX_ZOOM + 1, 0, 0) is None  # not cached, asked again
+    assert len(upstream[1]) == 2
+    assert cache.stats() == {"hits": 0, "misses": 0, "errors": 2, "tiles": 0, "bytes": 0}
+
+
+def test_lru_eviction(tmp_path, upstream):
+    cache = make_cache(tmp_path, upstream, max_bytes=3 * TILE_SIZE)
+    for x in range(3):
+        cache.get("overlay", 2, 0, x)
+        time.sleep(0.01)
+    cache.get("overlay", 2, 0, 0)  # touch the oldest tile, so tile 1 is now least recently used
+    time.sleep(0.01)
+    cache.get("overlay", 2, 0, 3)
+
+    assert cache.stats()["tiles"] == 3 and cache.stats()["bytes"] == 3 * TILE_SIZE
+    n_requests = len(upstream[1])
+    for x in (0, 2, 3):
+        cache.get("overlay", 2, 0, x)
+    assert len(upstream[1]) == n_requests
+    cache.get("overlay", 2, 0, 1)
+    assert len(upstream[1]) == n_requests + 1
+
+
+def test_proxy(tmp_path, upstream):
+    cache = make_cache(tmp_path, upstream)
+    server, url = start(make_handler(cache))
+    try:
+        for _ in range(2):
+            with urllib.request.urlopen(url + "/tiles/water-scarcity/0/0/0") as resp:
+                assert resp.status == 200 and resp.headers.get_content_type() == "image/png"
+                assert resp.read().startswith(b"/water-scarcity/0/0/0")
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(url + f"/tiles/water-scarcity/{MAX_ZOOM + 1}/0/0")
+        assert err.value.code == 502
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(url + "/tiles/unknown-layer/0/0/0")
+        assert err.value.code == 404
+        with urllib.request.urlopen(url + "/stats") as resp:
+            assert json.load(resp) == {"hits": 1, "misses": 1, "errors": 1, "tiles": 1, "bytes": TILE_SIZE}
+    finally:
+        server.shutdown()
+        server.server_close()